@@ -8,6 +8,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gestione_giornaliere.settings')
 django.setup()
 
 import pandas as pd
+from main.workbook import Workbook
 
 def analyze_definitions():
     print("Analyzing definitions.xlsx file structure...")
@@ -19,12 +20,12 @@ def analyze_definitions():
             print(f"File not found: {excel_file}")
             return
             
-        xl = pd.ExcelFile(excel_file)
-        print(f"Found sheets: {xl.sheet_names}")
+        workbook = Workbook(excel_file)
+        print(f"Found sheets: {workbook.sheet_names}")
         
         # Analyze first sheet (area names)
-        print(f"\n=== First Sheet: '{xl.sheet_names[0]}' (Area Names) ===")
-        first_df = pd.read_excel(excel_file, sheet_name=xl.sheet_names[0], header=None)
+        print(f"\n=== First Sheet: '{workbook.sheet_names[0]}' (Area Names) ===")
+        first_df = workbook.sheet(0)
         print(f"Shape: {first_df.shape}")
         print("Content:")
         for idx in range(min(10, len(first_df))):
@@ -32,9 +33,9 @@ def analyze_definitions():
             print(f"  Row {idx}: {row_values}")
         
         # Analyze area definition sheets
-        for i, sheet_name in enumerate(xl.sheet_names[1:], 1):
+        for i, sheet_name in enumerate(workbook.sheet_names[1:], 1):
             print(f"\n=== Sheet {i+1}: '{sheet_name}' (Area Definition) ===")
-            df = pd.read_excel(excel_file, sheet_name=sheet_name, header=None)
+            df = workbook.sheet(sheet_name)
             print(f"Shape: {df.shape}")
             
             # Look for "vie" row
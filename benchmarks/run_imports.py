@@ -0,0 +1,243 @@
+"""Benchmark delle importazioni Excel su un database SQLite temporaneo.
+
+Genera le cartelle sintetiche (vedi `benchmarks.workbooks`), le carica su ogni endpoint
+di importazione con il client di test di Django ed esegue il job nella richiesta
+(IMPORT_WORKERS = 0). Per ogni endpoint misura tempo, righe di foglio e record
+generati al secondo e numero di query su un database vuoto, poi ripete l'importazione su un database vuoto con
+tracemalloc attivo per la memoria di picco. I risultati vengono salvati in JSON.
+
+La memoria è riportata in due campi: `peak_memory_mb` è il picco delle allocazioni
+Python del solo processo principale (tracemalloc), `children_peak_rss_mb` il massimo
+RSS dei processi figli terminati durante l'importazione (pool di analisi di
+definitions.xlsx; None se non ce ne sono o se la piattaforma non lo fornisce).
+
+Uso (dalla radice del progetto):
+    python -m benchmarks.run_imports --machines 5 --streets 100 --area-sheets 30
+    python -m benchmarks.run_imports --compare benchmarks/results/precedente.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks import workbooks
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+ENDPOINTS = ['daily-activities', 'area-definitions', 'areas', 'streets']
+
+
+def setup_django(db_path):
+    """Configura Django su un database SQLite dedicato e applica le migrazioni"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gestione_giornaliere.settings')
+    from django.conf import settings
+
+    settings.DATABASES = {
+        'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(db_path)},
+    }
+    settings.IMPORT_WORKERS = 0
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+
+
+def reset_database():
+    """Svuota il database e ricrea utente e macchina usati dalle importazioni"""
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from main.models import CleaningMachine
+
+    call_command('flush', interactive=False, verbosity=0)
+    user = User.objects.create_user('benchmark')
+    machine = CleaningMachine.objects.create(name='Spazzatrice Benchmark')
+    return user, machine
+
+
+def upload(endpoint, path):
+    """Svuota il database e carica `path` sull'endpoint come farebbe il dashboard.
+
+    Restituisce una funzione senza argomenti che esegue il caricamento e l'ImportJob creato.
+    """
+    from django.test import Client
+    from django.urls import reverse
+    from main.models import ImportJob
+
+    user, machine = reset_database()
+    client = Client()
+    client.force_login(user)
+    data = {'cleaning_machine': machine.id} if endpoint == 'streets' else {}
+
+    def run():
+        with open(path, 'rb') as excel_file:
+            response = client.post(
+                reverse('import_' + endpoint.replace('-', '_')),
+                {'excel_file': excel_file, **data},
+            ).json()
+        if not response.get('success'):
+            raise RuntimeError(f"{endpoint}: {response.get('error')}")
+        return ImportJob.objects.get(id=response['job_id'])
+    return run
+
+
+class QueryCounter:
+    """Conta le query eseguite (CaptureQueriesContext perde quelle precedenti a ogni richiesta)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def children_max_rss():
+    """Massimo RSS (byte) tra i processi figli terminati finora, o None"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux riporta KiB, macOS byte
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def measure(endpoint, path, records):
+    from django.db import connection
+
+    run = upload(endpoint, path)
+    queries = QueryCounter()
+    with connection.execute_wrapper(queries):
+        started = time.perf_counter()
+        job = run()
+        wall_time = time.perf_counter() - started
+
+    run = upload(endpoint, path)
+    children_before = children_max_rss()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Il valore è un massimo cumulativo: conta solo se questa importazione lo ha superato
+    children_after = children_max_rss()
+    children_peak = children_after if children_after and children_after != children_before else None
+
+    return {
+        'endpoint': endpoint,
+        'records': records,
+        'status': job.status,
+        'message': job.result.get('message') or job.error,
+        'wall_time_s': round(wall_time, 3),
+        'rows_processed': job.rows_processed,
+        'rows_per_second': round(job.rows_processed / wall_time, 1) if wall_time else 0,
+        'records_per_second': round(records / wall_time, 1) if wall_time else 0,
+        'queries': queries.count,
+        'peak_memory_mb': round(peak / 2 ** 20, 2),
+        'children_peak_rss_mb': round(children_peak / 2 ** 20, 2) if children_peak else None,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Stampa il rapporto tempo/query rispetto a un file di risultati precedente"""
+    baseline = {item['endpoint']: item for item in json.loads(Path(baseline_path).read_text())['results']}
+    print(f"\nConfronto con {baseline_path}:")
+    for item in results:
+        previous = baseline.get(item['endpoint'])
+        if not previous:
+            continue
+        ratio = item['wall_time_s'] / previous['wall_time_s'] if previous['wall_time_s'] else 0
+        print(f"  {item['endpoint']:<18} tempo x{ratio:.2f}  query {previous['queries']} -> {item['queries']}"
+              f"  memoria {previous['peak_memory_mb']} -> {item['peak_memory_mb']} MB"
+              f"  figli {previous.get('children_peak_rss_mb')} -> {item['children_peak_rss_mb']} MB RSS")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--machines', type=int, default=3, help='fogli macchina della giornaliera')
+    parser.add_argument('--streets', type=int, default=40, help='vie per foglio')
+    parser.add_argument('--days', type=int, default=31, help='giorni del mese nella giornaliera')
+    parser.add_argument('--area-sheets', type=int, default=30, help='fogli area di definitions')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument('--output', help='file JSON dei risultati (default: benchmarks/results/<data>.json)')
+    parser.add_argument('--compare', help='file JSON di un benchmark precedente da confrontare')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='bench-imports-') as tmp:
+        tmp = Path(tmp)
+        setup_django(tmp / 'benchmark.sqlite3')
+
+        giornaliera = tmp / 'giornaliera.xlsx'
+        definitions = tmp / 'definitions.xlsx'
+        streets = tmp / 'streets.xlsx'
+        files = {
+            'daily-activities': (giornaliera, workbooks.make_giornaliera(
+                giornaliera, args.machines, args.streets, args.days, seed=args.seed)),
+            'area-definitions': (definitions, workbooks.make_definitions(
+                definitions, args.area_sheets, args.streets, seed=args.seed)),
+            'streets': (streets, workbooks.make_streets(streets, args.area_sheets, args.streets, seed=args.seed)),
+        }
+        files['areas'] = files['area-definitions']
+
+        results = []
+        for endpoint in args.endpoints:
+            path, records = files[endpoint]
+            result = measure(endpoint, path, records)
+            results.append(result)
+            print(f"{endpoint:<18} {result['status']:<8} {result['wall_time_s']:>8.3f} s "
+                  f"{result['rows_per_second']:>10.1f} righe/s {result['queries']:>6} query "
+                  f"{result['peak_memory_mb']:>8.2f} MB"
+                  + (f" (figli {result['children_peak_rss_mb']:.2f} MB RSS)" if result['children_peak_rss_mb'] else ""))
+
+    import django
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'parameters': {
+            'machines': args.machines,
+            'streets': args.streets,
+            'days': args.days,
+            'area_sheets': args.area_sheets,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nRisultati salvati in {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
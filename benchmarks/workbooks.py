@@ -0,0 +1,136 @@
+"""Generatore di cartelle Excel sintetiche per i benchmark delle importazioni.
+
+Le cartelle riproducono la struttura dei file reali in `docs/in`:
+- giornaliera: un foglio per macchina con mese/anno in A1, macchina in A2, numeri dei
+  giorni dalla colonna E della riga 3 e poi una riga per via con i passaggi;
+- definitions: foglio QUADRO GENERALE seguito da un foglio per area con il nome in A1
+  e, per ogni lavorazione, l'intestazione in colonna K, la riga VIE con i giorni 1-31
+  e l'elenco delle vie con i giorni programmati.
+I contenuti sono casuali ma riproducibili a parità di `seed`.
+"""
+import random
+from calendar import monthrange
+
+import openpyxl
+from openpyxl.utils import get_column_letter
+
+ITALIAN_MONTHS = [
+    'GENNAIO', 'FEBBRAIO', 'MARZO', 'APRILE', 'MAGGIO', 'GIUGNO',
+    'LUGLIO', 'AGOSTO', 'SETTEMBRE', 'OTTOBRE', 'NOVEMBRE', 'DICEMBRE',
+]
+
+OPERATIONS = [
+    'Spazzamento meccanizzato (1/SETTIMANA)',
+    'Spazzamento manuale/svuot. cestini (2/SETTIMANA)',
+    'Spazzamento meccanizzato (3/SETTIMANA)',
+]
+
+FIRST_DAY_COLUMN = 5  # colonna E dei fogli giornaliera
+
+
+def street_name(index):
+    return f"VIA BENCH {index:04d}"
+
+
+def area_name(index):
+    return f"Area Bench {index:03d}"
+
+
+def machine_name(index):
+    return f"Spazzatrice BENCH {index:02d}"
+
+
+def make_giornaliera(path, machines=3, streets=40, days=31, year=2025, month=7, density=0.3, seed=0):
+    """Scrive una cartella giornaliera con `machines` fogli da `streets` vie e `days` giorni.
+
+    Restituisce il numero di celle con passaggi (ordini di lavoro attesi).
+    """
+    rng = random.Random(seed)
+    days = min(days, monthrange(year, month)[1])
+    last_column = get_column_letter(FIRST_DAY_COLUMN + days + 3)
+    filled = 0
+
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for machine_idx in range(machines):
+        ws = wb.create_sheet(f"Spazzatrice {machine_idx + 1}")
+        ws.cell(row=1, column=1, value=f"{ITALIAN_MONTHS[month - 1]} {year}")
+        ws.cell(row=2, column=1, value=machine_name(machine_idx))
+        ws.merge_cells(f"A1:{last_column}1")
+        ws.merge_cells(f"A2:{last_column}2")
+        for day in range(1, days + 1):
+            ws.cell(row=3, column=FIRST_DAY_COLUMN + day - 1, value=day)
+
+        for street_idx in range(streets):
+            row = 4 + street_idx
+            ws.cell(row=row, column=1, value=street_name(machine_idx * streets + street_idx))
+            ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=4)
+            for day in range(1, days + 1):
+                if rng.random() < density:
+                    ws.cell(row=row, column=FIRST_DAY_COLUMN + day - 1, value=rng.randint(1, 3))
+                    filled += 1
+
+    wb.save(path)
+    return filled
+
+
+def make_definitions(path, area_sheets=30, streets=20, operations=2, year=2025, month=6, density=0.3, seed=0):
+    """Scrive una cartella definitions con `area_sheets` aree, ognuna con `operations`
+    lavorazioni su `streets` vie.
+
+    Restituisce il numero di giorni programmati (operazioni attese).
+    """
+    rng = random.Random(seed)
+    operations = OPERATIONS[:max(1, min(operations, len(OPERATIONS)))]
+    scheduled = 0
+
+    wb = openpyxl.Workbook()
+    summary = wb.active
+    summary.title = 'QUADRO GENERALE'
+    summary.cell(row=3, column=1, value='AREA')
+    summary.cell(row=3, column=2, value='STATO GENERALE')
+    for area_idx in range(area_sheets):
+        summary.cell(row=4 + area_idx, column=1, value=area_name(area_idx))
+
+    for area_idx in range(area_sheets):
+        ws = wb.create_sheet(area_name(area_idx))
+        ws.cell(row=1, column=1, value=area_name(area_idx))
+        ws.merge_cells('A1:AH1')
+        ws.cell(row=2, column=16, value=str(year))
+        ws.cell(row=2, column=17, value=ITALIAN_MONTHS[month - 1][:3])
+        ws.cell(row=4, column=11, value='LAVORAZIONI')
+
+        row = 6
+        for operation in operations:
+            ws.cell(row=row, column=11, value=operation)
+            ws.cell(row=row + 1, column=33, value='TOT')
+            ws.cell(row=row + 2, column=1, value='VIE')
+            for day in range(1, 32):
+                ws.cell(row=row + 2, column=1 + day, value=day)
+
+            row += 4
+            for street_idx in range(streets):
+                ws.cell(row=row, column=1, value=street_name(area_idx * streets + street_idx))
+                for day in range(1, 32):
+                    if rng.random() < density:
+                        ws.cell(row=row, column=1 + day, value=1)
+                        scheduled += 1
+                ws.cell(row=row, column=33, value=f"=SUM(B{row}:AF{row})")
+                row += 1
+            row += 1
+
+    wb.save(path)
+    return scheduled
+
+
+def make_streets(path, area_sheets=30, streets=20, seed=0):
+    """Scrive il foglio street_name / area_name / daily_passages per l'importazione strade"""
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(['street_name', 'area_name', 'daily_passages'])
+    for area_idx in range(area_sheets):
+        for street_idx in range(streets):
+            ws.append([street_name(area_idx * streets + street_idx), area_name(area_idx), rng.randint(1, 3)])
+    wb.save(path)
+    return area_sheets * streets
@@ -8,19 +8,18 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gestione_giornaliere.settings')
 django.setup()
 
 import pandas as pd
+from main.workbook import Workbook
 
 def check_operations():
     print("Checking cleaning operations across all area sheets...")
     
     try:
         excel_file = 'docs/in/definitions.xlsx'
-        xl = pd.ExcelFile(excel_file)
+        workbook = Workbook(excel_file)
         
         # Skip first sheet (QUADRO GENERALE) and check area sheets
-        for sheet_name in xl.sheet_names[1:6]:  # Check first 5 area sheets
+        for sheet_name, df in workbook.sheets(workbook.sheet_names[1:6]).items():  # Check first 5 area sheets
             print(f"\n=== {sheet_name} ===")
-            df = pd.read_excel(excel_file, sheet_name=sheet_name, header=None)
-            
             # Look for cleaning operation descriptions
             operations_found = []
             for row_idx in range(min(15, len(df))):
@@ -8,19 +8,20 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gestione_giornaliere.settings')
 django.setup()
 
 import pandas as pd
+from main.workbook import Workbook
 
 def detailed_analysis():
     print("Detailed analysis of definitions.xlsx...")
     
     try:
         excel_file = 'docs/in/definitions.xlsx'
-        xl = pd.ExcelFile(excel_file)
+        workbook = Workbook(excel_file)
         
         # Analyze a specific area sheet in detail
         sheet_name = '167'  # First area sheet
         print(f"\n=== Detailed Analysis of '{sheet_name}' ===")
         
-        df = pd.read_excel(excel_file, sheet_name=sheet_name, header=None)
+        df = workbook.sheet(sheet_name)
         print(f"Shape: {df.shape}")
         
         # Show first 10 rows completely to understand structure
@@ -77,6 +77,8 @@ DATABASES = {
     'sqlite': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # I test che usano solo SQLite (es. piani delle query) non richiedono il server MySQL
+        'TEST': {'DEPENDENCIES': []},
     },
     'default': {
         'ENGINE': 'django.db.backends.mysql',
@@ -91,6 +93,11 @@ DATABASES = {
     }
 }
 
+# Letture delle viste di consultazione sulla replica (main.routers)
+DATABASE_ROUTERS = ['main.routers.ReplicaRouter']
+DATABASE_REPLICA = None  # alias di DATABASES usato come replica in sola lettura (es. 'sqlite'); None: tutto su 'default'
+DATABASE_REPLICA_LAG = 5  # secondi di ritardo massimo della replica: dopo un'importazione la sessione legge dal principale
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -143,3 +150,29 @@ LOGOUT_REDIRECT_URL = '/login/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Import settings
+IMPORT_BATCH_SIZE = 1000  # righe per singola INSERT durante le importazioni massive
+IMPORT_WORKERS = 2  # thread dedicati alle importazioni in background (0 = esecuzione nella richiesta)
+IMPORT_PARSE_WORKERS = 1  # processi per la lettura dei fogli di definitions.xlsx (usati solo con almeno 20 fogli ciascuno, vedi main.parsers)
+IMPORT_COMMIT_ROWS = None  # conferma la transazione tra un foglio e l'altro ogni N righe scritte (None = una transazione per file)
+IMPORT_JOB_TIMEOUT = 3600  # secondi dopo i quali un'importazione ancora in attesa o in corso è considerata interrotta
+
+# Cache
+# Con più processi (es. gunicorn) usare una cache condivisa, ad esempio
+# 'django.core.cache.backends.filebased.FileBasedCache' con LOCATION = BASE_DIR / 'cache'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gestione-giornaliere',
+    }
+}
+VIEW_CACHE_TIMEOUT = 600  # secondi di validità dei dati in cache di dashboard e area_view
+
+# Report di conformità (programmazione / lavorazioni) e di utilizzo delle macchine
+COMPLIANCE_LATE_DAYS = 2  # giorni dopo quello programmato in cui un passaggio conta come "in ritardo"
+UTILIZATION_TOLERANCE = 0.1  # scostamento dal piano passaggi considerato in linea (10%)
+
+# Archivio degli ordini di lavoro (main.archive, comando archive_work_orders)
+ARCHIVE_AFTER_MONTHS = 24  # mesi chiusi più vecchi di questo numero vengono spostati in ArchivedWorkOrder
@@ -0,0 +1,21 @@
+"""Impostazioni per sviluppo e test senza il server MySQL.
+
+Principale e replica sono due file SQLite distinti (la replica non viene aggiornata:
+serve a verificare l'instradamento delle letture), es.:
+python manage.py test main --settings=gestione_giornaliere.settings_sqlite
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'sqlite': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db-replica.sqlite3',
+        'TEST': {'DEPENDENCIES': []},
+    },
+}
+DATABASE_REPLICA = 'sqlite'
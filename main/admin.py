@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CleaningMachine, Area, Street, WorkOrder, PassagePlan, CleaningOperationType, StreetCleaningOperation
+from .models import CleaningMachine, Area, Street, WorkOrder, PassagePlan, CleaningOperationType, StreetCleaningOperation, ImportJob, AreaMonthlyCoverage, ArchivedMonth
 
 
 @admin.register(CleaningMachine)
@@ -26,7 +26,7 @@ class StreetAdmin(admin.ModelAdmin):
 @admin.register(WorkOrder)
 class WorkOrderAdmin(admin.ModelAdmin):
     list_display = ['street', 'cleaning_machine', 'daily_passages', 'date', 'created_by']
-    list_filter = ['cleaning_machine', 'date', 'created_by', 'street__area']
+    list_filter = ['cleaning_machine', 'date', 'created_by', 'area']
     search_fields = ['street__name', 'cleaning_machine__name']
     date_hierarchy = 'date'
     readonly_fields = ['created_at', 'updated_at']
@@ -34,10 +34,11 @@ class WorkOrderAdmin(admin.ModelAdmin):
 
 @admin.register(PassagePlan)
 class PassagePlanAdmin(admin.ModelAdmin):
-    list_display = ['cleaning_machine', 'day_of_month', 'month', 'year', 'required_passages']
-    list_filter = ['cleaning_machine', 'month', 'year']
+    list_display = ['cleaning_machine', 'date', 'required_passages']
+    list_filter = ['cleaning_machine', 'date']
     search_fields = ['cleaning_machine__name']
-    ordering = ['year', 'month', 'day_of_month']
+    date_hierarchy = 'date'
+    ordering = ['date', 'cleaning_machine__name']
 
 
 @admin.register(CleaningOperationType)
@@ -49,8 +50,33 @@ class CleaningOperationTypeAdmin(admin.ModelAdmin):
 
 @admin.register(StreetCleaningOperation)
 class StreetCleaningOperationAdmin(admin.ModelAdmin):
-    list_display = ['street', 'operation_type', 'day_of_month', 'month', 'year']
-    list_filter = ['operation_type', 'month', 'year', 'street__area']
+    list_display = ['street', 'operation_type', 'date', 'day_of_month', 'month', 'year']
+    list_filter = ['operation_type', 'date', 'street__area']
     search_fields = ['street__name', 'operation_type__name']
-    date_hierarchy = None
-    ordering = ['year', 'month', 'day_of_month', 'street__name']
+    date_hierarchy = 'date'
+    ordering = ['date', 'street__name']
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ['file_name', 'kind', 'status', 'sheets_processed', 'rows_processed', 'created_by', 'created_at']
+    list_filter = ['kind', 'status', 'created_by']
+    search_fields = ['file_name']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+
+
+@admin.register(AreaMonthlyCoverage)
+class AreaMonthlyCoverageAdmin(admin.ModelAdmin):
+    list_display = ['area', 'month', 'year', 'covered_streets', 'total_streets', 'work_order_count', 'passage_sum', 'updated_at']
+    list_filter = ['year', 'month', 'area']
+    search_fields = ['area__name']
+    ordering = ['-year', '-month', 'area__name']
+    readonly_fields = ['area', 'year', 'month', 'total_streets', 'covered_streets', 'work_order_count', 'passage_sum', 'updated_at']
+
+
+@admin.register(ArchivedMonth)
+class ArchivedMonthAdmin(admin.ModelAdmin):
+    list_display = ['month', 'year', 'work_order_count', 'archived_at']
+    list_filter = ['year']
+    ordering = ['-year', '-month']
+    readonly_fields = ['year', 'month', 'work_order_count', 'archived_at']
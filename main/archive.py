@@ -0,0 +1,129 @@
+"""Archivio degli ordini di lavoro dei mesi chiusi.
+
+I mesi più vecchi di ARCHIVE_AFTER_MONTHS vengono spostati da WorkOrder ad
+ArchivedWorkOrder (stesso id, solo i campi usati da viste e report), così la tabella
+usata ogni giorno resta piccola. I riepiloghi mensili (AreaMonthlyCoverage) restano
+nella tabella calda. Viste e report leggono gli ordini tramite `work_order_sources`,
+che aggiunge l'archivio solo quando l'intervallo richiesto tocca un mese archiviato.
+"""
+from calendar import monthrange
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import caching, coverage
+from .models import ArchivedMonth, ArchivedWorkOrder, WorkOrder
+
+# Campi copiati nei due sensi: l'area si ricava sempre dalla strada, così un ordine
+# spostato non riporta un'area non più valida
+FIELDS = ['id', 'street_id', 'area_id', 'cleaning_machine_id', 'daily_passages', 'date', 'created_by_id']
+SOURCE_FIELDS = ['id', 'street_id', 'street__area_id', 'cleaning_machine_id', 'daily_passages', 'date', 'created_by_id']
+
+
+def month_range(year, month):
+    return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+
+def archived_months():
+    """Insieme dei mesi (anno, mese) archiviati, in cache finché non cambiano i dati"""
+    return caching.cached_view_data(
+        'archived-months', {}, lambda: frozenset(ArchivedMonth.objects.values_list('year', 'month')),
+    )
+
+
+def is_archived(start, end):
+    """True se l'intervallo di date tocca almeno un mese archiviato"""
+    return any((start.year, start.month) <= month <= (end.year, end.month) for month in archived_months())
+
+
+def work_order_sources(start, end):
+    """Querysets degli ordini di lavoro tra `start` ed `end`: WorkOrder e, se serve, l'archivio.
+
+    I due modelli hanno gli stessi campi street, area, cleaning_machine, date e
+    daily_passages, quindi i chiamanti applicano gli stessi filtri e aggregazioni a ognuno
+    e ne sommano i risultati.
+    """
+    sources = [WorkOrder.objects.filter(date__range=(start, end))]
+    if is_archived(start, end):
+        sources.append(ArchivedWorkOrder.objects.filter(date__range=(start, end)))
+    return sources
+
+
+def closed_months(before):
+    """Mesi con ordini nella tabella calda precedenti al mese di `before`"""
+    return sorted(
+        (month.year, month.month)
+        for month in WorkOrder.objects.filter(date__lt=before.replace(day=1)).dates('date', 'month')
+    )
+
+
+def _rows(work_orders):
+    """Ordini del queryset come dizionari di FIELDS, con l'area attuale della strada"""
+    return [dict(zip(FIELDS, row)) for row in work_orders.order_by('id').values_list(*SOURCE_FIELDS)]
+
+
+def _raw_delete(work_orders):
+    # Nessun modello fa riferimento agli ordini di lavoro: si eliminano senza caricarli
+    # né emettere segnali (riepiloghi e cache vengono aggiornati dal chiamante)
+    work_orders._raw_delete(work_orders.db)
+
+
+def archive_month(year, month, batch_size=None):
+    """Sposta nell'archivio gli ordini del mese. Restituisce il numero di ordini spostati"""
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    first, last = month_range(year, month)
+    unique_fields = None
+    if connection.features.supports_update_conflicts_with_target:
+        unique_fields = ['street', 'cleaning_machine', 'date']
+    with transaction.atomic(), coverage.deferred() as changes:
+        rows = _rows(WorkOrder.objects.filter(date__range=(first, last)))
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            # Gli ordini del mese rimasti nell'archivio (mese già archiviato) vengono
+            # sostituiti da quelli della tabella calda, più recenti
+            ArchivedWorkOrder.objects.bulk_create(
+                [ArchivedWorkOrder(**row) for row in batch],
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=['area', 'daily_passages'],
+            )
+            _raw_delete(WorkOrder.objects.filter(id__in=[row['id'] for row in batch]))
+        ArchivedMonth.objects.update_or_create(year=year, month=month, defaults={
+            'work_order_count': ArchivedWorkOrder.objects.filter(date__range=(first, last)).count(),
+        })
+        changes.mark_month(year, month)
+        transaction.on_commit(caching.bump_data_version)
+    return len(rows)
+
+
+def restore_month(year, month, batch_size=None):
+    """Riporta nella tabella calda gli ordini archiviati del mese (es. per reimportarlo).
+
+    Gli ordini della tabella calda con la stessa strada, macchina e data (inseriti o
+    modificati dall'admin dopo l'archiviazione) prevalgono su quelli archiviati, che
+    vengono scartati. Restituisce il numero di ordini ripristinati.
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    first, last = month_range(year, month)
+    with transaction.atomic(), coverage.deferred() as changes:
+        archived = ArchivedWorkOrder.objects.filter(date__range=(first, last))
+        present = set(
+            WorkOrder.objects.filter(date__range=(first, last)).values_list('street_id', 'cleaning_machine_id', 'date')
+        )
+        rows = [
+            row for row in _rows(archived)
+            if (row['street_id'], row['cleaning_machine_id'], row['date']) not in present
+        ]
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            # Un id riassegnato nel frattempo a un altro ordine ne riceve uno nuovo
+            taken = set(WorkOrder.objects.filter(id__in=[row['id'] for row in batch]).values_list('id', flat=True))
+            WorkOrder.objects.bulk_create([
+                WorkOrder(**{**row, 'id': None if row['id'] in taken else row['id']}) for row in batch
+            ])
+        _raw_delete(archived)
+        ArchivedMonth.objects.filter(year=year, month=month).delete()
+        changes.mark_month(year, month)
+        transaction.on_commit(caching.bump_data_version)
+    return len(rows)
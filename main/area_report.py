@@ -0,0 +1,125 @@
+"""Dati della vista area: matrice strade × giorni e totali calcolati lato server.
+
+Una query raggruppata per (strada, giorno, macchina) fornisce matrice, totali per
+strada e per macchina e riepilogo, costruiti in un unico passaggio. Il template stampa solo celle già calcolate. Per intervalli lunghi
+le colonne diventano mesi (raggruppati nel database), così una vista annuale resta
+di dimensioni contenute. Se l'intervallo tocca mesi archiviati le query si ripetono
+su ArchivedWorkOrder e i risultati vengono sommati.
+
+Gli ordini sono selezionati con la colonna denormalizzata `area`: quelli la cui strada
+non appartiene più all'area (aggiornamenti che non emettono segnali, loaddata) vengono
+esclusi da matrice e totali e segnalati nel log (vedi il comando check_work_order_areas).
+"""
+import logging
+from datetime import timedelta
+from itertools import chain
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from .archive import work_order_sources
+from .models import CleaningMachine
+
+# Oltre questo numero di giorni la matrice ha una colonna per mese
+MAX_DAY_COLUMNS = 62
+
+logger = logging.getLogger(__name__)
+
+
+def date_range(start, end):
+    days = []
+    day = start
+    while day <= end:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def by_month(start, end):
+    return (end - start).days >= MAX_DAY_COLUMNS
+
+
+def report_columns(start, end):
+    """Colonne della matrice: [{'start', 'end', 'label'}] per giorno o, oltre MAX_DAY_COLUMNS giorni, per mese"""
+    if not by_month(start, end):
+        return [{'start': day, 'end': day, 'label': day.strftime('%d/%m')} for day in date_range(start, end)]
+    columns = []
+    month_start = start.replace(day=1)
+    while month_start <= end:
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        columns.append({
+            'start': month_start,
+            'end': min(next_month - timedelta(days=1), end),
+            'label': month_start.strftime('%m/%Y'),
+        })
+        month_start = next_month
+    return columns
+
+
+def area_report(area, start, end):
+    """Matrice passaggi strade × giorni (o mesi) dell'area tra `start` ed `end` e totali per strada e macchina.
+
+    Restituisce {'columns', 'by_month', 'rows': [{'street', 'cells', 'work_orders', 'passages'}],
+    'machines': [{'machine', 'work_orders', 'passages'}], 'summary'}; le celle senza
+    ordini sono None.
+    """
+    streets = list(area.streets.order_by('name'))
+    columns = report_columns(start, end)
+    column_index = {column['start']: i for i, column in enumerate(columns)}
+    street_index = {street.id: i for i, street in enumerate(streets)}
+    sources = [work_orders.filter(area_id=area.id) for work_orders in work_order_sources(start, end)]
+    rows = (
+        work_orders
+        .annotate(column=TruncMonth('date') if by_month(start, end) else F('date'))
+        .values_list('street_id', 'column', 'cleaning_machine_id')
+        .annotate(count=Count('id'), passages=Sum('daily_passages'))
+        .order_by()
+        for work_orders in sources
+    )
+
+    cells = [[None] * len(columns) for _ in streets]
+    street_totals = [[0, 0] for _ in streets]
+    machine_totals = {}
+    covered_streets = set()
+    orphans = 0
+    for street_id, column_start, machine_id, count, passages in chain.from_iterable(rows):
+        row = street_index.get(street_id)
+        if row is None:
+            orphans += count
+            continue
+        if passages:
+            covered_streets.add(street_id)
+        column = column_index[column_start]
+        cells[row][column] = (cells[row][column] or 0) + passages
+        street_totals[row][0] += count
+        street_totals[row][1] += passages
+        totals = machine_totals.setdefault(machine_id, [0, 0])
+        totals[0] += count
+        totals[1] += passages
+
+    if orphans:
+        logger.warning(
+            "Area %s: %d ordini di lavoro con strade di altre aree esclusi dal report "
+            "(manage.py check_work_order_areas --fix)", area.id, orphans,
+        )
+
+    machines = CleaningMachine.objects.in_bulk(machine_totals)
+    return {
+        'columns': columns,
+        'by_month': by_month(start, end),
+        'rows': [
+            {'street': street, 'cells': street_cells, 'work_orders': count, 'passages': passages}
+            for street, street_cells, (count, passages) in zip(streets, cells, street_totals)
+        ],
+        'machines': [
+            {'machine': machines[machine_id], 'work_orders': count, 'passages': passages}
+            for machine_id, (count, passages) in sorted(
+                machine_totals.items(), key=lambda item: machines[item[0]].name)
+        ],
+        'summary': {
+            'work_orders': sum(count for count, _ in street_totals),
+            'passages': sum(passages for _, passages in street_totals),
+            'machines': len(machine_totals),
+            'streets_covered': len(covered_streets),
+        },
+    }
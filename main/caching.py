@@ -0,0 +1,76 @@
+"""Cache dei dati delle viste, invalidata da un contatore globale di versione dei dati.
+
+Ogni chiave contiene la versione corrente: quando i dati cambiano (importazioni,
+modifiche da admin) la versione viene incrementata e le voci precedenti non vengono
+più lette, scadendo da sole. Funziona con qualsiasi backend di cache di Django;
+con più processi serve una cache condivisa (file, memcached) perché l'incremento
+sia visto da tutti. I dati letti da una replica (main.routers) non vengono salvati
+nei DATABASE_REPLICA_LAG secondi successivi a una modifica, quando la replica potrebbe
+non averla ancora ricevuta.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .routers import reading_from_replica
+
+DATA_VERSION_KEY = 'data-version'
+DATA_CHANGED_KEY = 'data-changed-at'
+
+_state = threading.local()
+
+
+def data_version():
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        # Valore iniziale sempre nuovo: se la chiave è stata rimossa dalla cache
+        # non si rischia di rileggere voci salvate con una versione precedente
+        cache.add(DATA_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(DATA_VERSION_KEY)
+    return version
+
+
+def bump_data_version():
+    cache.set(DATA_CHANGED_KEY, time.time(), timeout=None)
+    try:
+        return cache.incr(DATA_VERSION_KEY)
+    except ValueError:
+        return data_version()
+
+
+def bump_data_version_on_commit():
+    """Incrementa la versione alla conferma della transazione corrente (segnali dei modelli)"""
+    if not getattr(_state, 'suppressed', False):
+        transaction.on_commit(bump_data_version)
+
+
+@contextmanager
+def suppress_bumps():
+    """Ignora gli incrementi dei segnali nel blocco; chi lo usa incrementa la versione una volta sola"""
+    previous = getattr(_state, 'suppressed', False)
+    _state.suppressed = True
+    try:
+        yield
+    finally:
+        _state.suppressed = previous
+
+
+def changed_within(seconds):
+    """True se i dati sono cambiati negli ultimi `seconds` secondi"""
+    changed_at = cache.get(DATA_CHANGED_KEY)
+    return changed_at is not None and time.time() - changed_at < seconds
+
+
+def cached_view_data(name, params, build):
+    """Restituisce i dati della vista `name` per i parametri indicati, calcolandoli con `build` se mancano"""
+    key = ':'.join([f'view-data:{name}:{data_version()}', *(f'{k}={params[k]}' for k in sorted(params))])
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        if not (reading_from_replica() and changed_within(settings.DATABASE_REPLICA_LAG)):
+            cache.set(key, data, settings.VIEW_CACHE_TIMEOUT)
+    return data
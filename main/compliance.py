@@ -0,0 +1,159 @@
+"""Confronto tra programmazione (StreetCleaningOperation) e lavorazioni eseguite (WorkOrder).
+
+Per un mese (e facoltativamente un'area) programmazione e lavorazioni diventano matrici
+booleane strade × giorni; gli esiti si ricavano con operazioni tra matrici:
+
+- puntuale: passaggio eseguito nel giorno programmato;
+- in ritardo: nessun passaggio nel giorno programmato, ma uno non programmato nei
+  COMPLIANCE_LATE_DAYS giorni successivi (dello stesso mese);
+- mancato: nessun passaggio né nel giorno né in ritardo;
+- non programmato: passaggio eseguito in un giorno senza operazioni programmate e non
+  usato come recupero di un passaggio in ritardo.
+
+Un ordine di lavoro non indica il tipo di operazione, quindi un passaggio soddisfa tutte
+le operazioni programmate per quella strada e quel giorno. Un passaggio non programmato
+invece recupera una sola operazione mancata: i mancati vengono abbinati in ordine di
+giorno (e di tipo) al primo passaggio non programmato ancora libero. I risultati restano in cache finché non cambia la versione dei dati.
+"""
+from calendar import monthrange
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+
+from .caching import cached_view_data
+from .archive import work_order_sources
+from .models import CleaningOperationType, Street, StreetCleaningOperation
+
+OUTCOMES = ['planned', 'on_time', 'late', 'missed', 'unplanned']
+
+
+def compare(planned, actual, late_days):
+    """Esiti da matrici booleane strade × giorni.
+
+    `planned` è {tipo operazione: matrice}, `actual` la matrice dei passaggi eseguiti.
+    Restituisce ({tipo: {'planned', 'on_time', 'late', 'missed'}}, matrice dei non programmati).
+    """
+    planned_any = np.zeros_like(actual)
+    for matrix in planned.values():
+        planned_any |= matrix
+    # Passaggi non programmati non ancora usati per recuperare un mancato
+    available = actual & ~planned_any
+
+    days = actual.shape[1]
+    not_done = {operation_type_id: matrix & ~actual for operation_type_id, matrix in planned.items()}
+    late = {operation_type_id: np.zeros_like(actual) for operation_type_id in planned}
+    for day in range(days):
+        for operation_type_id in sorted(planned):
+            pending = not_done[operation_type_id][:, day].copy()
+            for recovery_day in range(day + 1, min(day + late_days, days - 1) + 1):
+                if not pending.any():
+                    break
+                recovered = pending & available[:, recovery_day]
+                late[operation_type_id][:, day] |= recovered
+                available[:, recovery_day] &= ~recovered
+                pending &= ~recovered
+
+    outcomes = {
+        operation_type_id: {
+            'planned': matrix,
+            'on_time': matrix & actual,
+            'late': late[operation_type_id],
+            'missed': not_done[operation_type_id] & ~late[operation_type_id],
+        }
+        for operation_type_id, matrix in planned.items()
+    }
+    return outcomes, available
+
+
+def _counts(**matrices):
+    """Conteggi per riga (strada) di ogni matrice"""
+    return {name: matrix.sum(axis=1) for name, matrix in matrices.items()}
+
+
+def _load(year, month, area_id):
+    first, last = date(year, month, 1), date(year, month, monthrange(year, month)[1])
+    operations = StreetCleaningOperation.objects.filter(date__range=(first, last))
+    sources = [work_orders.filter(daily_passages__gt=0) for work_orders in work_order_sources(first, last)]
+    if area_id is not None:
+        operations = operations.filter(street__area_id=area_id)
+        sources = [work_orders.filter(area_id=area_id) for work_orders in sources]
+    planned = np.array(list(operations.values_list('street_id', 'operation_type_id', 'day_of_month')),
+                       dtype=np.int64).reshape(-1, 3)
+    # Le coppie ripetute nelle due tabelle (mese archiviato) impostano la stessa cella
+    executed = [(street_id, work_date.day) for work_orders in sources for street_id, work_date in
+                work_orders.values_list('street_id', 'date').distinct().order_by()]
+    return planned, np.array(executed, dtype=np.int64).reshape(-1, 2), last.day
+
+
+def build_report(year, month, area_id=None, late_days=None):
+    """Report di conformità del mese: totali e dettaglio per strada, area e tipo di operazione"""
+    if late_days is None:
+        late_days = settings.COMPLIANCE_LATE_DAYS
+    planned_rows, executed_rows, days = _load(year, month, area_id)
+
+    street_ids = np.unique(np.concatenate([planned_rows[:, 0], executed_rows[:, 0]]))
+    actual = np.zeros((len(street_ids), days), dtype=bool)
+    actual[np.searchsorted(street_ids, executed_rows[:, 0]), executed_rows[:, 1] - 1] = True
+    planned = {}
+    for operation_type_id in np.unique(planned_rows[:, 1]):
+        rows = planned_rows[planned_rows[:, 1] == operation_type_id]
+        matrix = np.zeros_like(actual)
+        matrix[np.searchsorted(street_ids, rows[:, 0]), rows[:, 2] - 1] = True
+        planned[int(operation_type_id)] = matrix
+
+    outcomes, unplanned = compare(planned, actual, late_days)
+
+    # Conteggi per strada (somma sui tipi) e per tipo di operazione
+    per_street = {name: np.zeros(len(street_ids), dtype=np.int64) for name in OUTCOMES}
+    per_street['unplanned'] = unplanned.sum(axis=1)
+    per_type = {}
+    for operation_type_id, matrices in outcomes.items():
+        counts = _counts(**matrices)
+        per_type[operation_type_id] = {name: int(value.sum()) for name, value in counts.items()}
+        for name, value in counts.items():
+            per_street[name] += value
+
+    streets = {
+        street_id: (name, area_id, area_name) for street_id, name, area_id, area_name in
+        Street.objects.filter(id__in=street_ids.tolist()).values_list('id', 'name', 'area_id', 'area__name')
+    }
+    operation_types = CleaningOperationType.objects.in_bulk(list(per_type))
+
+    street_rows = []
+    areas = {}
+    for i, street_id in enumerate(street_ids.tolist()):
+        name, street_area_id, area_name = streets[street_id]
+        counts = {outcome: int(per_street[outcome][i]) for outcome in OUTCOMES}
+        street_rows.append({'street_id': street_id, 'street': name, 'area_id': street_area_id, **counts})
+        area = areas.setdefault(street_area_id, {
+            'area_id': street_area_id, 'area': area_name, **{outcome: 0 for outcome in OUTCOMES},
+        })
+        for outcome, value in counts.items():
+            area[outcome] += value
+
+    totals = {outcome: int(per_street[outcome].sum()) for outcome in OUTCOMES}
+    return {
+        'year': year,
+        'month': month,
+        'area_id': area_id,
+        'late_days': late_days,
+        'totals': totals,
+        'compliance': round(totals['on_time'] / totals['planned'], 4) if totals['planned'] else None,
+        'areas': sorted(areas.values(), key=lambda row: row['area']),
+        'streets': sorted(street_rows, key=lambda row: (row['area_id'], row['street'])),
+        'operation_types': sorted(
+            ({'operation_type_id': type_id, 'operation_type': operation_types[type_id].name, **counts}
+             for type_id, counts in per_type.items()),
+            key=lambda row: row['operation_type'],
+        ),
+    }
+
+
+def compliance_report(year, month, area_id=None):
+    """`build_report` in cache finché non cambiano i dati"""
+    return cached_view_data(
+        'compliance',
+        {'year': year, 'month': month, 'area': area_id, 'late_days': settings.COMPLIANCE_LATE_DAYS},
+        lambda: build_report(year, month, area_id),
+    )
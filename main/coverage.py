@@ -0,0 +1,216 @@
+"""Manutenzione della tabella AreaMonthlyCoverage.
+
+Le righe vengono ricalcolate per mese con poche query aggregate: dalle importazioni,
+che raccolgono i mesi toccati dentro `deferred()` e li ricalcolano una volta sola alla
+fine, e dai segnali di WorkOrder e Street per le modifiche dell'admin, che con
+`deferred_until_commit()` ricalcolano i mesi una volta sola alla conferma della
+transazione (es. eliminazione di molti ordini o di una strada con i suoi ordini). Gli ordini dei mesi archiviati (ArchivedWorkOrder) vengono sommati a quelli
+della tabella calda. `rebuild()` ricostruisce l'intera tabella (comando `rebuild_coverage`).
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date
+
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
+from django.utils.dateparse import parse_date
+
+from .models import ArchivedWorkOrder, AreaMonthlyCoverage, Street, WorkOrder
+
+_state = threading.local()
+
+
+class CoverageChanges:
+    """Mesi e aree da ricalcolare raccolti durante un blocco `deferred()`"""
+
+    def __init__(self):
+        self.months = set()
+        self.street_areas = set()
+
+    def mark_month(self, year, month):
+        self.months.add((year, month))
+
+    def mark_date(self, work_date):
+        if isinstance(work_date, str):
+            # Es. WorkOrder(date='2025-07-02').save(): sull'istanza la data resta una stringa
+            work_date = parse_date(work_date)
+        if work_date:
+            self.mark_month(work_date.year, work_date.month)
+
+    def mark_streets(self, area_ids):
+        """Segnala che il numero di strade delle aree indicate è cambiato"""
+        self.street_areas.update(area_ids)
+
+    def apply(self):
+        if self.months:
+            refresh_months(self.months)
+        if self.street_areas:
+            refresh_street_totals(self.street_areas)
+        self.clear()
+
+    def clear(self):
+        self.months.clear()
+        self.street_areas.clear()
+
+
+@contextmanager
+def deferred():
+    """Raccoglie le modifiche segnalate nel blocco e ricalcola i riepiloghi all'uscita"""
+    changes = getattr(_state, 'changes', None)
+    if changes is not None:
+        # Blocco annidato: il ricalcolo avviene all'uscita di quello esterno
+        yield changes
+        return
+    changes = _state.changes = CoverageChanges()
+    try:
+        yield changes
+    finally:
+        _state.changes = None
+    changes.apply()
+
+
+@contextmanager
+def deferred_until_commit(using=None):
+    """Come `deferred()`, ma dentro una transazione il ricalcolo avviene alla sua conferma.
+
+    Le modifiche segnalate nella stessa transazione vengono raccolte insieme e i mesi
+    vengono ricalcolati una volta sola; fuori da una transazione il ricalcolo è immediato.
+    """
+    db = transaction.get_connection(using)
+    if getattr(_state, 'changes', None) is not None or not db.in_atomic_block:
+        with deferred() as changes:
+            yield changes
+        return
+    pending = getattr(_state, 'on_commit', {})
+    changes, callback = pending.get(db.alias, (None, None))
+    # La transazione precedente può essere stata annullata insieme al suo callback
+    if not any(func is callback for _, func, _ in db.run_on_commit):
+        changes = CoverageChanges()
+
+        def callback():
+            pending.pop(db.alias, None)
+            with transaction.atomic(using=db.alias):
+                changes.apply()
+
+        pending[db.alias] = (changes, callback)
+        _state.on_commit = pending
+        transaction.on_commit(callback, using=db.alias)
+    yield changes
+
+
+def _month_stats(work_orders):
+    """{(area_id, anno, mese): (ordini, passaggi, strade coperte)} con una sola query raggruppata"""
+    rows = (
+        work_orders
+        .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values_list('area_id', 'year', 'month')
+        .annotate(
+            work_orders=Count('id'),
+            passages=Sum('daily_passages'),
+            covered=Count('street', distinct=True, filter=Q(daily_passages__gt=0)),
+        )
+        .order_by()
+    )
+    return {(area_id, year, month): stats for area_id, year, month, *stats in rows}
+
+
+def _covered_streets(work_orders):
+    """{(area_id, anno, mese): {strade con passaggi}}"""
+    covered = defaultdict(set)
+    for area_id, year, month, street_id in (
+        work_orders.filter(daily_passages__gt=0)
+        .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values_list('area_id', 'year', 'month', 'street_id').distinct().order_by()
+    ):
+        covered[(area_id, year, month)].add(street_id)
+    return covered
+
+
+def _combined_stats(date_filter):
+    """`_month_stats` sugli ordini della tabella calda e dell'archivio (main.archive)"""
+    hot = WorkOrder.objects.filter(date_filter)
+    archived = ArchivedWorkOrder.objects.filter(date_filter)
+    stats = _month_stats(hot)
+    archived_stats = _month_stats(archived)
+    overlapping = [key for key in archived_stats if key in stats]
+    for key, (work_orders, passages, covered) in archived_stats.items():
+        hot_orders, hot_passages, hot_covered = stats.get(key, (0, 0, 0))
+        stats[key] = (hot_orders + work_orders, (hot_passages or 0) + (passages or 0), hot_covered + covered)
+    if overlapping:
+        # Mesi con ordini in entrambe le tabelle (es. inseriti dall'admin dopo
+        # l'archiviazione): le strade coperte si contano sull'unione
+        hot_covered, archived_covered = _covered_streets(hot), _covered_streets(archived)
+        for key in overlapping:
+            work_orders, passages, _ = stats[key]
+            stats[key] = (work_orders, passages, len(hot_covered[key] | archived_covered[key]))
+    return stats
+
+
+def _street_totals(area_ids=None):
+    streets = Street.objects.all() if area_ids is None else Street.objects.filter(area_id__in=area_ids)
+    return dict(streets.values_list('area_id').annotate(total=Count('id')).order_by())
+
+
+def _write(stats, months_filter):
+    """Sostituisce le righe selezionate da `months_filter` con quelle calcolate in `stats`"""
+    totals = _street_totals({area_id for area_id, _, _ in stats})
+    AreaMonthlyCoverage.objects.filter(months_filter).delete()
+    rows = [
+        AreaMonthlyCoverage(
+            area_id=area_id,
+            year=year,
+            month=month,
+            total_streets=totals.get(area_id, 0),
+            covered_streets=covered,
+            work_order_count=work_orders,
+            passage_sum=passages or 0,
+        )
+        for (area_id, year, month), (work_orders, passages, covered) in stats.items()
+    ]
+    # Un'altra importazione può aver appena scritto le stesse righe
+    unique_fields = None
+    if connection.features.supports_update_conflicts_with_target:
+        unique_fields = ['area', 'year', 'month']
+    AreaMonthlyCoverage.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=['total_streets', 'covered_streets', 'work_order_count', 'passage_sum', 'updated_at'],
+    )
+    return len(rows)
+
+
+def refresh_months(months):
+    """Ricalcola i riepiloghi di tutte le aree per i mesi [(anno, mese)] indicati"""
+    months = set(months)
+    if not months:
+        return 0
+    first = min(date(year, month, 1) for year, month in months)
+    last_year, last_month = max(months)
+    last = date(last_year + last_month // 12, last_month % 12 + 1, 1)
+
+    stats = _combined_stats(Q(date__gte=first, date__lt=last))
+    stats = {key: value for key, value in stats.items() if key[1:] in months}
+    months_filter = Q()
+    for year, month in months:
+        months_filter |= Q(year=year, month=month)
+    return _write(stats, months_filter)
+
+
+def refresh_street_totals(area_ids):
+    """Aggiorna il numero di strade delle righe esistenti delle aree indicate"""
+    street_count = (
+        Street.objects.filter(area_id=OuterRef('area_id'))
+        .values('area_id').annotate(total=Count('id')).values('total')
+    )
+    return AreaMonthlyCoverage.objects.filter(area_id__in=set(area_ids)).update(
+        total_streets=Coalesce(Subquery(street_count), 0),
+    )
+
+
+def rebuild():
+    """Ricostruisce da zero l'intera tabella a partire da tutti gli ordini di lavoro"""
+    return _write(_combined_stats(Q()), Q())
@@ -0,0 +1,122 @@
+"""Dati del pannello di controllo calcolati con poche query aggregate.
+
+Il numero di query non dipende dal numero di aree: lo stato di copertura viene letto
+dalla tabella AreaMonthlyCoverage (una riga per area e mese), le lavorazioni per
+giorno con una query raggruppata e le settimane vengono poi ricavate in memoria dal
+giorno del mese. Per i mesi archiviati le stesse query si ripetono su ArchivedWorkOrder
+(vedi main.archive).
+"""
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db.models import Count, Q, Sum
+
+from .archive import work_order_sources
+from .models import Area, AreaMonthlyCoverage
+
+
+def month_weeks(year, month):
+    """Settimane del mese come blocchi di 7 giorni a partire dal giorno 1: [{'start', 'end'}]"""
+    last_day = date(year, month, monthrange(year, month)[1])
+    weeks = []
+    week_start = date(year, month, 1)
+    while week_start <= last_day:
+        week_end = min(week_start + timedelta(days=6), last_day)
+        weeks.append({'start': week_start, 'end': week_end})
+        week_start = week_end + timedelta(days=1)
+    return weeks
+
+
+def week_index(day):
+    """Indice (da 0) della settimana di `month_weeks` che contiene il giorno del mese `day`"""
+    return (day - 1) // 7
+
+
+def coverage_status(covered_streets, total_streets):
+    """Colore e descrizione dello stato di copertura di un'area"""
+    if covered_streets == 0:
+        return {'color': 'danger', 'label': 'Nessun passaggio'}
+    if covered_streets < total_streets:
+        return {'color': 'warning', 'label': 'Passaggi parziali'}
+    return {'color': 'success', 'label': 'Tutte le vie coperte'}
+
+
+def area_status(monthly_coverage):
+    """Stato di copertura da una riga AreaMonthlyCoverage (None: nessun ordine nel mese)"""
+    if monthly_coverage is None:
+        return coverage_status(0, 0)
+    return coverage_status(monthly_coverage.covered_streets, monthly_coverage.total_streets)
+
+
+def area_overview(year, month):
+    """Stato e riepilogo settimanale di ogni area per il mese indicato.
+
+    Restituisce (settimane, righe) dove ogni riga è
+    {'area', 'status', 'weeks': [{'start', 'end', 'label', 'count', 'passages'}]}.
+    Gli ordini di ogni settimana si leggono a parte con `work_order_page`.
+    """
+    weeks = month_weeks(year, month)
+    sources = work_order_sources(weeks[0]['start'], weeks[-1]['end'])
+
+    areas = list(Area.objects.order_by('id'))
+    coverage = {
+        row.area_id: row for row in AreaMonthlyCoverage.objects.filter(year=year, month=month)
+    }
+
+    # Lavorazioni e passaggi per area e giorno, raggruppati poi per settimana
+    weekly = defaultdict(lambda: [[0, 0] for _ in weeks])
+    for month_orders in sources:
+        for area_id, work_date, count, passages in (
+            month_orders.values_list('area_id', 'date')
+            .annotate(count=Count('id'), passages=Sum('daily_passages'))
+            .order_by()
+        ):
+            bucket = weekly[area_id][week_index(work_date.day)]
+            bucket[0] += count
+            bucket[1] += passages
+
+    rows = []
+    for area in areas:
+        rows.append({
+            'area': area,
+            'status': area_status(coverage.get(area.id)),
+            'weeks': [
+                {
+                    'start': week['start'],
+                    'end': week['end'],
+                    'label': f"{week['start'].strftime('%d/%m')} - {week['end'].strftime('%d/%m')}",
+                    'count': count,
+                    'passages': passages,
+                }
+                for week, (count, passages) in zip(weeks, weekly[area.id])
+            ],
+        })
+    return weeks, rows
+
+
+def work_order_page(area_id, start, end, cursor=None, limit=50):
+    """Una pagina degli ordini di lavoro dell'area tra `start` ed `end`, ordinati per (data, id).
+
+    La paginazione è per chiave: `cursor` è la coppia (data, id) dell'ultimo ordine della
+    pagina precedente. Restituisce (ordini, cursore della pagina successiva o None).
+    Con mesi archiviati nell'intervallo le pagine delle due tabelle vengono fuse; gli
+    ordini archiviati conservano l'id originale, quindi l'ordinamento resta univoco.
+    """
+    page = []
+    for work_orders in work_order_sources(start, end):
+        work_orders = (
+            work_orders
+            .filter(area_id=area_id)
+            .select_related('street', 'cleaning_machine')
+            .order_by('date', 'id')
+        )
+        if cursor:
+            last_date, last_id = cursor
+            work_orders = work_orders.filter(Q(date__gt=last_date) | Q(date=last_date, id__gt=last_id))
+        page.extend(work_orders[:limit + 1])
+    page = sorted(page, key=lambda order: (order.date, order.id))[:limit + 1]
+    if len(page) <= limit:
+        return page, None
+    page = page[:limit]
+    return page, (page[-1].date, page[-1].id)
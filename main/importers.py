@@ -0,0 +1,675 @@
+"""Funzioni di supporto per le importazioni massive da Excel.
+
+Le funzioni `run_*_import` contengono la logica delle importazioni e restituiscono
+il dizionario di esito ({'success', 'message'/'error', 'warnings'}) mostrato
+all'utente. Vengono eseguite dal worker delle importazioni in background (vedi
+`main.jobs`) e ricevono un oggetto `progress` su cui segnalano l'avanzamento.
+"""
+from calendar import monthrange
+from contextlib import contextmanager
+
+import openpyxl
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from . import caching, coverage
+from .archive import archived_months
+from .models import Area, Street, WorkOrder, CleaningMachine, CleaningOperationType, StreetCleaningOperation, calendar_date
+from .resolvers import ReferenceResolver
+
+
+class NullProgress:
+    """Segnalatore di avanzamento che non registra nulla (importazioni eseguite direttamente)"""
+
+    def start(self, sheets_total):
+        pass
+
+    def advance(self, sheets=0, rows=0):
+        pass
+
+
+class ImportTransaction:
+    """Transazione di un'importazione: una per file caricato, con un savepoint per foglio.
+
+    Un errore dentro `sheet()` annulla solo le scritture di quel foglio e viene aggiunto
+    a `errors`; un errore fuori dai fogli annulla l'intera importazione. Con
+    IMPORT_COMMIT_ROWS la transazione viene confermata e riaperta tra un foglio e
+    l'altro quando le righe scritte superano la soglia, così i file molto grandi non
+    tengono aperta un'unica transazione. Con `dry_run` tutte le scritture vengono
+    annullate all'uscita.
+
+    I mesi e le aree segnalati su `coverage` vengono ricalcolati in AreaMonthlyCoverage
+    prima di ogni conferma della transazione; dopo la conferma viene incrementata una
+    sola volta la versione dei dati della cache delle viste.
+    """
+
+    def __init__(self, errors, commit_rows=None, dry_run=False):
+        self.errors = errors
+        self.dry_run = dry_run
+        self.commit_rows = settings.IMPORT_COMMIT_ROWS if commit_rows is None else commit_rows
+        if dry_run:
+            self.commit_rows = None
+        self.pending_rows = 0
+        self._atomic = None
+
+    def __enter__(self):
+        self._atomic = transaction.atomic()
+        self._atomic.__enter__()
+        self._deferred = coverage.deferred()
+        self.coverage = self._deferred.__enter__()
+        self._suppressed = caching.suppress_bumps()
+        self._suppressed.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if self.dry_run:
+                self.coverage.clear()
+            self._deferred.__exit__(exc_type, exc_value, traceback)
+            if exc_type is None and not self.dry_run:
+                transaction.on_commit(caching.bump_data_version)
+        except Exception as e:
+            self._atomic.__exit__(type(e), e, e.__traceback__)
+            raise
+        finally:
+            self._suppressed.__exit__(None, None, None)
+        if self.dry_run:
+            transaction.set_rollback(True)
+        return self._atomic.__exit__(exc_type, exc_value, traceback)
+
+    @contextmanager
+    def sheet(self, error_message):
+        """Savepoint di un foglio; in caso di errore aggiunge "`error_message`: <eccezione>" a `errors`"""
+        pending_rows = self.pending_rows
+        try:
+            with transaction.atomic():
+                yield
+        except Exception as e:
+            self.pending_rows = pending_rows
+            self.errors.append(f"{error_message}: {str(e)}")
+        if self.commit_rows and self.pending_rows >= self.commit_rows:
+            self.coverage.apply()
+            transaction.on_commit(caching.bump_data_version)
+            self._atomic.__exit__(None, None, None)
+            self._atomic = transaction.atomic()
+            self._atomic.__enter__()
+            self.pending_rows = 0
+
+    def written(self, rows):
+        """Conta le righe scritte dal foglio corrente ai fini di IMPORT_COMMIT_ROWS"""
+        self.pending_rows += rows
+        return rows
+
+
+def diff_rows(existing, desired):
+    """Confronta due dizionari {chiave: valore} (stato attuale e stato del file).
+
+    Restituisce gli insiemi di chiavi (da inserire, da aggiornare, da eliminare).
+    """
+    inserts = desired.keys() - existing.keys()
+    deletes = existing.keys() - desired.keys()
+    updates = {key for key in desired.keys() & existing.keys() if desired[key] != existing[key]}
+    return inserts, updates, deletes
+
+
+def delete_in_chunks(model, ids, chunk_size=None):
+    """Elimina i record di `model` con gli id indicati, a blocchi"""
+    chunk_size = chunk_size or settings.IMPORT_BATCH_SIZE
+    ids = list(ids)
+    for start in range(0, len(ids), chunk_size):
+        model.objects.filter(id__in=ids[start:start + chunk_size]).delete()
+    return len(ids)
+
+
+def bulk_upsert_work_orders(rows, user, chunk_size=None):
+    """Inserisce o aggiorna gli ordini di lavoro a blocchi.
+
+    `rows` è un iterabile di tuple (street_id, area_id, cleaning_machine_id, date,
+    daily_passages), dove `area_id` è l'area della strada; a parità di chiave vince
+    l'ultima tupla. Restituisce il numero di ordini scritti.
+    """
+    chunk_size = chunk_size or settings.IMPORT_BATCH_SIZE
+    passages_by_key = {}
+    for street_id, area_id, machine_id, work_date, passages in rows:
+        passages_by_key[(street_id, machine_id, work_date)] = (area_id, passages)
+
+    work_orders = [
+        WorkOrder(
+            street_id=street_id,
+            area_id=area_id,
+            cleaning_machine_id=machine_id,
+            date=work_date,
+            daily_passages=passages,
+            created_by=user,
+        )
+        for (street_id, machine_id, work_date), (area_id, passages) in passages_by_key.items()
+    ]
+
+    # MySQL non accetta unique_fields: usa implicitamente la chiave unica della tabella
+    unique_fields = None
+    if connection.features.supports_update_conflicts_with_target:
+        unique_fields = ['street', 'cleaning_machine', 'date']
+
+    WorkOrder.objects.bulk_create(
+        work_orders,
+        batch_size=chunk_size,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=['area', 'daily_passages', 'updated_at'],
+    )
+    return len(work_orders)
+
+
+def importa_aree(filepath):
+    """Legge le definizioni delle aree scorrendo una sola volta la colonna A di ogni foglio.
+
+    Struttura di un foglio: A1 contiene il nome dell'area; dalla riga 6 in poi ogni cella
+    piena è un'operazione, le cui vie partono 4 righe più sotto e terminano alla prima
+    cella vuota. Restituisce {area: [{'operazione': ..., 'vie': [...]}]}.
+    """
+    wb = openpyxl.load_workbook(filepath, read_only=True)
+    aree = {}
+
+    try:
+        for sheet in wb.worksheets:
+            area = None
+            operazioni = []
+            operazione = None  # operazione di cui si stanno leggendo le vie
+            prima_via = None
+            for row, (value,) in enumerate(sheet.iter_rows(max_col=1, values_only=True), start=1):
+                if row == 1:
+                    area = value
+                    if not area:
+                        break
+                elif row < 6:
+                    continue
+                elif operazione is None:
+                    if value:
+                        operazione = {'operazione': value, 'vie': []}
+                        operazioni.append(operazione)
+                        prima_via = row + 4
+                elif row < prima_via:
+                    continue
+                elif value and str(value).strip() != "":
+                    operazione['vie'].append(value)
+                else:
+                    # La prima cella vuota chiude l'elenco delle vie
+                    operazione = None
+            if area:
+                aree[area] = operazioni
+    finally:
+        wb.close()
+    return aree
+
+
+def run_streets_import(source, file_name, user, progress, cleaning_machine_id):
+    """Importa i passaggi del giorno da un foglio con colonne street_name, area_name, daily_passages"""
+    try:
+        from datetime import date
+        from .workbook import Workbook
+
+        cleaning_machine = CleaningMachine.objects.get(id=cleaning_machine_id)
+
+        with Workbook(source, header=0) as workbook:
+            df = workbook.sheet(0)
+        progress.start(sheets_total=1)
+
+        required_columns = ['street_name', 'area_name', 'daily_passages']
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        if missing_columns:
+            return {
+                'success': False,
+                'error': f'Colonne mancanti: {", ".join(missing_columns)}'
+            }
+
+        errors = []
+        rows = []
+
+        for index, row in df.iterrows():
+            try:
+                rows.append((
+                    str(row['area_name']).strip(),
+                    str(row['street_name']).strip(),
+                    int(row['daily_passages']),
+                ))
+            except Exception as e:
+                errors.append(f"Row {index + 1}: {str(e)}")
+
+        # Aree, strade e ordini di lavoro vengono scritti tutti o nessuno
+        with ImportTransaction(errors) as tx:
+            resolver = ReferenceResolver()
+            area_ids = resolver.resolve(Area, {area_name for area_name, _, _ in rows})
+            street_ids = resolver.resolve(Street, {
+                (area_ids[area_name], street_name) for area_name, street_name, _ in rows
+            })
+            imported_count = bulk_upsert_work_orders(
+                (
+                    (street_ids[(area_ids[area_name], street_name)], area_ids[area_name], cleaning_machine.id, date.today(), passages)
+                    for area_name, street_name, passages in rows
+                ),
+                user,
+            )
+            tx.coverage.mark_date(date.today())
+            tx.coverage.mark_streets(area_id for area_id, _ in resolver.created(Street))
+
+        progress.advance(sheets=1, rows=len(df))
+
+        if errors:
+            return {
+                'success': False,
+                'error': f'Imported {imported_count} records with errors: {"; ".join(errors[:5])}'
+            }
+
+        return {
+            'success': True,
+            'message': f'Successfully imported {imported_count} work orders'
+        }
+
+    except ImportError:
+        return {
+            'success': False,
+            'error': 'pandas library is required for Excel import. Please install it.'
+        }
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+def run_areas_import(source, file_name, user, progress):
+    """Importa aree, tipi di operazione e strade dai fogli letti con importa_aree"""
+    try:
+        aree = importa_aree(source)
+        progress.start(sheets_total=len(aree))
+
+        errors = []
+        with ImportTransaction(errors) as tx:
+            resolver = ReferenceResolver()
+            description = {'description': f'Importata da {file_name}'}
+            area_ids = resolver.resolve(Area, {str(area_name): description for area_name in aree})
+            op_type_ids = resolver.resolve(CleaningOperationType, {
+                str(op['operazione']): description
+                for operazioni in aree.values() for op in operazioni
+            })
+
+            # Collega ogni strada ai tipi di operazione dell'area (senza data)
+            links = {}
+            for area_name, operazioni in aree.items():
+                area_links = links.setdefault(str(area_name), [])
+                for op in operazioni:
+                    for via_name in op['vie']:
+                        if via_name and str(via_name).strip():
+                            area_links.append((area_ids[str(area_name)], str(via_name).strip(), op_type_ids[str(op['operazione'])]))
+            street_ids = resolver.resolve(Street, {
+                (area_id, via_name) for area_links in links.values() for area_id, via_name, _ in area_links
+            })
+            tx.coverage.mark_streets(area_id for area_id, _ in resolver.created(Street))
+
+            existing_links = set(
+                StreetCleaningOperation.objects.filter(street_id__in=set(street_ids.values()))
+                .values_list('street_id', 'operation_type_id')
+            )
+            for area_name, area_links in links.items():
+                # Savepoint per area: un errore annulla solo i collegamenti dell'area corrente
+                with tx.sheet(f"Errore nell'elaborazione dell'area '{area_name}'"):
+                    new_links = {
+                        (street_ids[(area_id, via_name)], op_type_id) for area_id, via_name, op_type_id in area_links
+                    } - existing_links
+                    StreetCleaningOperation.objects.bulk_create(
+                        [StreetCleaningOperation(street_id=street_id, operation_type_id=op_type_id) for street_id, op_type_id in new_links],
+                        batch_size=settings.IMPORT_BATCH_SIZE,
+                    )
+                    existing_links |= new_links
+                    tx.written(len(new_links))
+                progress.advance(sheets=1, rows=len(area_links))
+
+        result = {'success': True, 'imported_areas': list(aree.keys())}
+        if errors:
+            result['warnings'] = errors[:10]
+        return result
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+def run_daily_activities_import(source, file_name, user, progress, dry_run=False):
+    """Import daily activities from Excel file with Italian format.
+
+    Ogni foglio è il riepilogo completo del mese di una macchina: gli ordini esistenti
+    di quella macchina e di quel mese vengono confrontati con il foglio e vengono
+    scritti solo gli inserimenti, gli aggiornamenti e le cancellazioni necessari.
+    Con `dry_run` viene restituito solo il riepilogo delle differenze.
+    """
+    try:
+        from datetime import date
+        import re
+        from .parsers import extract_day_grid, find_day_columns
+        from .workbook import Workbook
+
+        with Workbook(source) as workbook:
+            sheets = workbook.sheets()
+        progress.start(sheets_total=len(sheets))
+
+        errors = []
+        machine_names = []
+        parsed_sheets = []
+        archived = archived_months()
+
+        # Process each sheet (one per cleaning machine)
+        for sheet_name, df in sheets.items():
+            try:
+                if df.empty or len(df) < 4:
+                    errors.append(f"Sheet '{sheet_name}' is too small or empty")
+                    continue
+
+                # Extract month/year from row 0 (e.g., "LUGLIO 2025")
+                month_year_cell = str(df.iloc[0, 0]).strip()
+                month_match = re.search(r'(\w+)\s+(\d{4})', month_year_cell)
+
+                if not month_match:
+                    errors.append(f"Could not parse month/year from '{month_year_cell}' in sheet '{sheet_name}'")
+                    continue
+
+                month_name = month_match.group(1)
+                year = int(month_match.group(2))
+
+                # Convert Italian month names to numbers
+                italian_months = {
+                    'GENNAIO': 1, 'FEBBRAIO': 2, 'MARZO': 3, 'APRILE': 4, 'MAGGIO': 5, 'GIUGNO': 6,
+                    'LUGLIO': 7, 'AGOSTO': 8, 'SETTEMBRE': 9, 'OTTOBRE': 10, 'NOVEMBRE': 11, 'DICEMBRE': 12
+                }
+
+                month_num = italian_months.get(month_name.upper())
+                if not month_num:
+                    errors.append(f"Unknown month name '{month_name}' in sheet '{sheet_name}'")
+                    continue
+
+                # I mesi archiviati non si modificano: vanno prima riportati nella tabella calda
+                if (year, month_num) in archived:
+                    errors.append(
+                        f"Month {month_num:02d}/{year} of sheet '{sheet_name}' is archived: restore it with "
+                        f"'manage.py archive_work_orders --restore {year}-{month_num:02d}' before importing"
+                    )
+                    continue
+
+                # Extract cleaning machine name from row 1
+                machine_name = str(df.iloc[1, 0]).strip()
+                machine_names.append(machine_name)
+
+                # Find which columns of the day numbers row (row 2) contain day numbers
+                day_columns, days = find_day_columns(df)
+
+                if not len(day_columns):
+                    errors.append(f"No valid day numbers found in sheet '{sheet_name}'")
+                    continue
+
+                # Street x day matrix from row 3 as (street_idx, day, passages) rows
+                days_in_month = monthrange(year, month_num)[1]
+                street_names, grid = extract_day_grid(df, day_columns, days)
+                grid = grid[grid[:, 1] <= days_in_month]
+                parsed_sheets.append((machine_name, year, month_num, street_names, grid))
+
+            except Exception as e:
+                errors.append(f"Error processing sheet '{sheet_name}': {str(e)}")
+                continue
+            finally:
+                progress.advance(sheets=1, rows=len(df))
+
+        diff = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        with ImportTransaction(errors, dry_run=dry_run) as tx:
+            # Resolve machines, default areas and streets of all sheets in bulk
+            resolver = ReferenceResolver()
+            machine_ids = resolver.resolve(CleaningMachine, {
+                name: {'description': f'Imported from {file_name}'} for name in machine_names
+            })
+            created_machines = resolver.created(CleaningMachine)
+            # Default area for streets without specific area assignment
+            area_ids = resolver.resolve(Area, {
+                f"Area {machine_name}": {'description': f'Default area for {machine_name}'}
+                for machine_name, _, _, _, _ in parsed_sheets
+            })
+            street_ids = resolver.resolve(Street, {
+                (area_ids[f"Area {machine_name}"], street_name)
+                for machine_name, _, _, street_names, _ in parsed_sheets
+                for street_name in street_names
+            })
+            tx.coverage.mark_streets(area_id for area_id, _ in resolver.created(Street))
+
+            # Stato desiderato per (macchina, anno, mese): {(street_id, data): passaggi}
+            desired = {}
+            for machine_name, year, month_num, street_names, grid in parsed_sheets:
+                area_id = area_ids[f"Area {machine_name}"]
+                sheet_street_ids = [street_ids[(area_id, street_name)] for street_name in street_names]
+                work_dates = {day: date(year, month_num, day) for day in range(1, monthrange(year, month_num)[1] + 1)}
+                month_rows = desired.setdefault((machine_name, year, month_num), {})
+                for street_idx, day, passages in grid.tolist():
+                    month_rows[(sheet_street_ids[street_idx], work_dates[day])] = passages
+
+            street_areas = {street_id: area_id for (area_id, _), street_id in street_ids.items()}
+
+            # Ordini esistenti delle macchine e dei mesi del file, con una sola query
+            months = {(machine_ids[machine_name], year, month_num) for machine_name, year, month_num in desired}
+            existing = {}
+            existing_ids = {}
+            if months:
+                for wo_id, street_id, machine_id, work_date, passages in WorkOrder.objects.filter(
+                    cleaning_machine_id__in={machine_id for machine_id, _, _ in months},
+                    date__gte=min(date(year, month_num, 1) for _, year, month_num in months),
+                    date__lte=max(date(year, month_num, monthrange(year, month_num)[1]) for _, year, month_num in months),
+                ).values_list('id', 'street_id', 'cleaning_machine_id', 'date', 'daily_passages'):
+                    month_key = (machine_id, work_date.year, work_date.month)
+                    if month_key in months:
+                        existing.setdefault(month_key, {})[(street_id, work_date)] = passages
+                        existing_ids[(machine_id, street_id, work_date)] = wo_id
+
+            # Savepoint per foglio: un errore annulla solo gli ordini della macchina corrente
+            for (machine_name, year, month_num), month_rows in desired.items():
+                machine_id = machine_ids[machine_name]
+                with tx.sheet(f"Error saving work orders of '{machine_name}'"):
+                    inserts, updates, deletes = diff_rows(existing.get((machine_id, year, month_num), {}), month_rows)
+                    if not dry_run:
+                        bulk_upsert_work_orders(
+                            ((street_id, street_areas[street_id], machine_id, work_date, month_rows[(street_id, work_date)])
+                             for street_id, work_date in inserts | updates),
+                            user,
+                        )
+                        delete_in_chunks(WorkOrder, (existing_ids[(machine_id, *key)] for key in deletes))
+                        if inserts or updates or deletes:
+                            tx.coverage.mark_month(year, month_num)
+                    tx.written(len(inserts) + len(updates) + len(deletes))
+                    diff['inserted'] += len(inserts)
+                    diff['updated'] += len(updates)
+                    diff['deleted'] += len(deletes)
+                    diff['unchanged'] += len(month_rows) - len(inserts) - len(updates)
+
+        if dry_run:
+            success_msg = (
+                f"Simulazione: {diff['inserted']} ordini da inserire, {diff['updated']} da aggiornare, "
+                f"{diff['deleted']} da eliminare, {diff['unchanged']} invariati. Nessuna modifica salvata"
+            )
+            if created_machines:
+                success_msg += f'. Nuove macchine: {", ".join(created_machines)}'
+        else:
+            imported_count = diff['inserted'] + diff['updated'] + diff['unchanged']
+            success_msg = (
+                f"Importati con successo {imported_count} ordini di lavoro ({diff['inserted']} nuovi, "
+                f"{diff['updated']} aggiornati, {diff['deleted']} eliminati)"
+            )
+            if created_machines:
+                success_msg += f'. Create nuove macchine: {", ".join(created_machines)}'
+
+        if errors:
+            return {
+                'success': True,
+                'message': success_msg,
+                'warnings': errors[:10],  # Limit to first 10 errors
+                'dry_run': dry_run,
+                'diff': diff,
+            }
+
+        return {
+            'success': True,
+            'message': success_msg,
+            'dry_run': dry_run,
+            'diff': diff,
+        }
+
+    except ImportError:
+        return {
+            'success': False,
+            'error': 'pandas library is required for Excel import. Please install it.'
+        }
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+
+def run_area_definitions_import(source, file_name, user, progress, dry_run=False):
+    """Import area definitions from Excel file with cleaning operation types.
+
+    I fogli vengono letti e analizzati da `parse_definitions_workbook` (in parallelo
+    con IMPORT_PARSE_WORKERS > 1); questa funzione si limita a salvare i record ottenuti
+    in un'unica transazione, con un savepoint per foglio. Ogni foglio sostituisce le
+    operazioni del suo mese per l'area: vengono inserite le operazioni nuove ed eliminate
+    quelle non più presenti, comprese quelle create da `generate_schedule` per lo stesso
+    mese e la stessa area.
+    Con `dry_run` viene restituito solo il riepilogo delle differenze.
+    """
+    try:
+        from datetime import date
+        from .parsers import parse_definitions_workbook
+
+        records = parse_definitions_workbook(source, settings.IMPORT_PARSE_WORKERS)
+        progress.start(sheets_total=len(records))
+
+        errors = []
+        diff = {'inserted': 0, 'deleted': 0, 'unchanged': 0}
+
+        # Resolve areas, operation types and streets of all sheets in bulk
+        area_entries = {}
+        op_type_entries = {}
+        for record in records:
+            if record['skip']:
+                continue
+            area_entries[record['sheet']] = {'description': f'Area importata da {file_name}'}
+            for operation_name, frequency in record['operation_headers']:
+                op_type_entries.setdefault(operation_name, {
+                    'description': f"Operazione importata da {record['sheet']}",
+                    'frequency_per_week': frequency
+                })
+            # If no specific operation types found, use a default one
+            if record['default_operation']:
+                op_type_entries.setdefault("Spazzamento Standard", {
+                    'description': 'Operazione standard', 'frequency_per_week': 1
+                })
+
+        with ImportTransaction(errors, dry_run=dry_run) as tx:
+            resolver = ReferenceResolver()
+            area_ids = resolver.resolve(Area, area_entries)
+            op_type_ids = resolver.resolve(CleaningOperationType, op_type_entries)
+            street_ids = resolver.resolve(Street, {
+                (area_ids[record['sheet']], street_name)
+                for record in records if not record['skip'] and not record['error']
+                for street_name, _ in record['streets']
+            })
+            tx.coverage.mark_streets(area_id for area_id, _ in resolver.created(Street))
+
+            # Operazioni esistenti delle aree e dei mesi del file, con una sola query
+            periods = {
+                (area_ids[record['sheet']], record['month'], record['year'])
+                for record in records if not record['skip'] and not record['error']
+            }
+            existing = {}
+            if periods:
+                first = min(date(year, month, 1) for _, month, year in periods)
+                last_year, last_month = max((year, month) for _, month, year in periods)
+                last = date(last_year + last_month // 12, last_month % 12 + 1, 1)
+                for op_id, area_id, street_id, op_type_id, day_of_month, month, year in StreetCleaningOperation.objects.filter(
+                    # Intervallo di date indicizzato; i giorni non validi (es. 31 giugno) non hanno data
+                    Q(date__gte=first, date__lt=last)
+                    | Q(date__isnull=True, year__in={year for _, _, year in periods}, month__in={month for _, month, _ in periods}),
+                    street__area_id__in={area_id for area_id, _, _ in periods},
+                ).values_list('id', 'street__area_id', 'street_id', 'operation_type_id', 'day_of_month', 'month', 'year'):
+                    if (area_id, month, year) in periods:
+                        existing.setdefault((area_id, month, year), {})[(street_id, op_type_id, day_of_month)] = op_id
+
+            for record in records:
+                sheet_name = record['sheet']
+
+                if record['skip']:
+                    errors.append(record['skip'])
+                elif record['error']:
+                    errors.append(record['error'])
+                else:
+                    # Savepoint per foglio: un errore annulla solo il foglio corrente
+                    with tx.sheet(f"Errore nell'elaborazione del foglio '{sheet_name}'"):
+                        area_id = area_ids[sheet_name]
+                        operations = {
+                            (street_ids[(area_id, street_name)], op_type_ids[operation_name], day_of_month)
+                            for street_name, street_operations in record['streets']
+                            for operation_name, day_of_month in street_operations
+                        }
+                        current = existing.get((area_id, record['month'], record['year']), {})
+                        new_operations, _, removed_operations = diff_rows(current, dict.fromkeys(operations))
+                        if not dry_run:
+                            StreetCleaningOperation.objects.bulk_create(
+                                [
+                                    StreetCleaningOperation(
+                                        street_id=street_id,
+                                        operation_type_id=op_type_id,
+                                        day_of_month=day_of_month,
+                                        month=record['month'],
+                                        year=record['year'],
+                                        date=calendar_date(record['year'], record['month'], day_of_month),
+                                    )
+                                    for street_id, op_type_id, day_of_month in new_operations
+                                ],
+                                batch_size=settings.IMPORT_BATCH_SIZE,
+                            )
+                            delete_in_chunks(StreetCleaningOperation, (current[key] for key in removed_operations))
+                        tx.written(len(new_operations) + len(removed_operations))
+                        diff['inserted'] += len(new_operations)
+                        diff['deleted'] += len(removed_operations)
+                        diff['unchanged'] += len(operations) - len(new_operations)
+                progress.advance(sheets=1, rows=record['rows'])
+
+        imported_areas = len(resolver.created(Area))
+        imported_streets = len(resolver.created(Street))
+        created_operation_types = resolver.created(CleaningOperationType)
+
+        if dry_run:
+            success_msg = (
+                f"Simulazione: {imported_areas} nuove aree, {imported_streets} nuove strade, "
+                f"{diff['inserted']} operazioni da inserire, {diff['deleted']} da eliminare, "
+                f"{diff['unchanged']} invariate. Nessuna modifica salvata"
+            )
+        else:
+            success_msg = f"Importate con successo {imported_areas} aree, {imported_streets} strade, {diff['inserted']} operazioni"
+            if diff['deleted']:
+                success_msg += f" ({diff['deleted']} operazioni rimosse)"
+        if created_operation_types:
+            success_msg += f'. Creati tipi operazione: {", ".join(created_operation_types[:3])}'
+            if len(created_operation_types) > 3:
+                success_msg += f' e altri {len(created_operation_types) - 3}'
+
+        if errors:
+            return {
+                'success': True,
+                'message': success_msg,
+                'warnings': errors[:10],  # Limit to first 10 errors
+                'dry_run': dry_run,
+                'diff': diff,
+            }
+
+        return {
+            'success': True,
+            'message': success_msg,
+            'dry_run': dry_run,
+            'diff': diff,
+        }
+
+    except ImportError:
+        return {
+            'success': False,
+            'error': 'La libreria pandas è richiesta per l\'importazione Excel. Installala.'
+        }
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
@@ -0,0 +1,152 @@
+"""Esecuzione in background delle importazioni.
+
+Le importazioni vengono eseguite da un pool di thread locale al processo (nessun broker
+esterno): la vista salva il file caricato, crea un `ImportJob` e restituisce subito il suo
+id; il client interroga poi `import_job_status` per seguirne l'avanzamento.
+
+Un job rimasto in attesa (dalla creazione) o in corso (dall'avvio) oltre
+IMPORT_JOB_TIMEOUT secondi, es. per un processo riavviato durante l'importazione, viene
+segnato come fallito da `recover_stale_jobs`. Il controllo si basa solo sul database,
+così funziona anche con più processi e cache locali a ciascuno. Tutti i cambi di stato
+sono aggiornamenti condizionati: un worker ancora vivo non sovrascrive un job già
+recuperato, e il file di un job in corso resta al suo worker.
+"""
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import importers
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+RUNNERS = {
+    'streets': importers.run_streets_import,
+    'areas': importers.run_areas_import,
+    'daily-activities': importers.run_daily_activities_import,
+    'area-definitions': importers.run_area_definitions_import,
+}
+
+_executor = None
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def stale_jobs():
+    """Job in attesa dalla creazione o in corso dall'avvio da più di IMPORT_JOB_TIMEOUT secondi"""
+    cutoff = timezone.now() - timedelta(seconds=settings.IMPORT_JOB_TIMEOUT)
+    return ImportJob.objects.filter(
+        Q(status='pending', created_at__lt=cutoff) | Q(status='running', started_at__lt=cutoff)
+    )
+
+
+def recover_stale_jobs():
+    """Segna come falliti i job di `stale_jobs()`. Restituisce il numero di job recuperati"""
+    stale = stale_jobs()
+    recovered = 0
+    for job_id, status, file_path in stale.values_list('id', 'status', 'file_path'):
+        # Aggiornamento condizionato: un worker che ha appena avviato o concluso il job prevale
+        if stale.filter(id=job_id).update(
+            status='failed',
+            error="Importazione interrotta (processo riavviato o tempo massimo superato)",
+            finished_at=timezone.now(),
+        ):
+            if status == 'pending':
+                # Non verrà più avviato (run_job parte solo dai job in attesa); il file di
+                # un job in corso lo elimina il suo worker, se è ancora attivo
+                _remove_file(file_path)
+            recovered += 1
+    if recovered:
+        logger.warning("Import jobs marked as failed after %s s: %d", settings.IMPORT_JOB_TIMEOUT, recovered)
+    return recovered
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # Primo job del processo: si chiudono quelli lasciati a metà da processi precedenti
+        recover_stale_jobs()
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMPORT_WORKERS,
+            thread_name_prefix='import-job',
+        )
+    return _executor
+
+
+def enqueue_import(kind, uploaded_file, user, parameters=None):
+    """Salva il file caricato, crea il job e lo mette in coda. Restituisce l'ImportJob"""
+    suffix = Path(uploaded_file.name).suffix or '.xlsx'
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        for chunk in uploaded_file.chunks():
+            tmp.write(chunk)
+
+    job = ImportJob.objects.create(
+        kind=kind,
+        file_name=uploaded_file.name,
+        file_path=tmp.name,
+        parameters=parameters or {},
+        created_by=user,
+    )
+    transaction.on_commit(lambda: submit(job.id))
+    return job
+
+
+def submit(job_id):
+    """Avvia il job nel pool; con IMPORT_WORKERS = 0 lo esegue subito nel thread corrente"""
+    if settings.IMPORT_WORKERS:
+        _get_executor().submit(run_job, job_id)
+    else:
+        run_job(job_id)
+
+
+def run_job(job_id):
+    if settings.IMPORT_WORKERS:
+        close_old_connections()
+    started_at = timezone.now()
+    if not ImportJob.objects.filter(id=job_id, status='pending').update(status='running', started_at=started_at):
+        # Già segnato come interrotto da recover_stale_jobs
+        return
+    job = ImportJob.objects.get(id=job_id)
+
+    try:
+        runner = RUNNERS[job.kind]
+        result = runner(job.file_path, job.file_name, job.created_by, job, **job.parameters)
+        job.result = result
+        job.warnings = result.get('warnings', [])
+        job.status = 'success' if result.get('success') else 'failed'
+        job.error = result.get('error', '')
+    except Exception as e:
+        logger.exception("Import job %s failed", job_id)
+        job.status = 'failed'
+        job.error = str(e)
+    finally:
+        job.finished_at = timezone.now()
+        # Se nel frattempo recover_stale_jobs ha segnato il job come fallito, resta fallito
+        finished = ImportJob.objects.filter(id=job_id, status='running').update(
+            status=job.status,
+            result=job.result,
+            warnings=job.warnings,
+            error=job.error,
+            finished_at=job.finished_at,
+            **{field: getattr(job, field) for field in job.PROGRESS_FIELDS},
+        )
+        if not finished:
+            logger.warning("Import job %s finished after being marked as failed", job_id)
+        cache.delete(job.progress_cache_key)
+        _remove_file(job.file_path)
+        if settings.IMPORT_WORKERS:
+            close_old_connections()
@@ -0,0 +1,45 @@
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main import archive
+
+
+def _month(value):
+    try:
+        year, month = (int(part) for part in value.split('-'))
+        date(year, month, 1)
+    except ValueError:
+        raise CommandError(f"Mese non valido '{value}': usare il formato AAAA-MM")
+    return year, month
+
+
+class Command(BaseCommand):
+    help = "Sposta in ArchivedWorkOrder gli ordini di lavoro dei mesi chiusi (o li ripristina con --restore)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help="archivia i mesi precedenti a AAAA-MM (default: ARCHIVE_AFTER_MONTHS mesi fa)")
+        parser.add_argument('--restore', help="riporta nella tabella calda il mese AAAA-MM")
+
+    def handle(self, *args, before=None, restore=None, **options):
+        started = time.perf_counter()
+        if restore:
+            year, month = _month(restore)
+            moved = archive.restore_month(year, month)
+            self.stdout.write(self.style.SUCCESS(
+                f"{month:02d}/{year}: {moved} ordini ripristinati in {time.perf_counter() - started:.1f} s"
+            ))
+            return
+
+        if before:
+            year, month = _month(before)
+        else:
+            today = date.today()
+            months = today.year * 12 + today.month - 1 - settings.ARCHIVE_AFTER_MONTHS
+            year, month = months // 12, months % 12 + 1
+        for year, month in archive.closed_months(date(year, month, 1)):
+            moved = archive.archive_month(year, month)
+            self.stdout.write(f"{month:02d}/{year}: {moved} ordini archiviati")
+        self.stdout.write(self.style.SUCCESS(f"Archiviazione completata in {time.perf_counter() - started:.1f} s"))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+
+from main import caching, coverage
+from main.models import ArchivedWorkOrder, Street, WorkOrder
+
+
+class Command(BaseCommand):
+    help = "Verifica che l'area degli ordini di lavoro (anche archiviati) coincida con l'area della loro strada"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="corregge gli ordini non allineati")
+
+    def handle(self, *args, fix=False, **options):
+        sources = [
+            (model._meta.verbose_name_plural, model.objects.filter(Q(area__isnull=True) | ~Q(area_id=F('street__area_id'))))
+            for model in (WorkOrder, ArchivedWorkOrder)
+        ]
+        counts = {name: mismatched.count() for name, mismatched in sources}
+        count = sum(counts.values())
+        if not count:
+            self.stdout.write(self.style.SUCCESS("Tutti gli ordini di lavoro hanno l'area della propria strada"))
+            return
+        if not fix:
+            for name, mismatched in sources:
+                for street_area, area, total in (
+                    mismatched.values_list('street__area__name', 'area__name').annotate(total=Count('id')).order_by()
+                ):
+                    self.stdout.write(f"  {name}: strade di '{street_area}' con area '{area or '-'}': {total} ordini")
+            raise CommandError(f"{count} ordini di lavoro con area diversa da quella della strada (usa --fix per correggerli)")
+
+        fixed = 0
+        with transaction.atomic(), coverage.deferred() as changes:
+            for _, mismatched in sources:
+                for month in mismatched.dates('date', 'month'):
+                    changes.mark_date(month)
+                fixed += mismatched.update(
+                    area_id=Subquery(Street.objects.filter(pk=OuterRef('street_id')).values('area_id')[:1]),
+                )
+            transaction.on_commit(caching.bump_data_version)
+        self.stdout.write(self.style.SUCCESS(f"Ordini di lavoro corretti: {fixed}"))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.schedule import generate_schedule
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera le operazioni di pulizia datate dalle frequenze settimanali dei tipi di operazione. "
+        "Importando poi definitions.xlsx per lo stesso mese e area, le operazioni generate "
+        "che il file non contiene vengono eliminate"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, required=True)
+        parser.add_argument('--month', type=int, help="genera solo il mese indicato (default: intero anno)")
+        parser.add_argument('--area', type=int, help="id dell'area (default: tutte le aree)")
+
+    def handle(self, *args, year, month=None, area=None, **options):
+        if month is not None and not 1 <= month <= 12:
+            raise CommandError("--month deve essere compreso tra 1 e 12")
+        started = time.perf_counter()
+        written = generate_schedule(year, month, area)
+        self.stdout.write(self.style.SUCCESS(
+            f"Operazioni programmate create: {written} in {time.perf_counter() - started:.1f} s"
+        ))
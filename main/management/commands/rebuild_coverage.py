@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from main import caching, coverage
+
+
+class Command(BaseCommand):
+    help = "Ricostruisce la tabella AreaMonthlyCoverage a partire dagli ordini di lavoro"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help="ricalcola solo l'anno indicato")
+        parser.add_argument('--month', type=int, help="ricalcola solo il mese indicato (richiede --year)")
+
+    def handle(self, *args, year=None, month=None, **options):
+        if month and not year:
+            raise CommandError("--month richiede --year")
+        with transaction.atomic():
+            if year and month:
+                rows = coverage.refresh_months({(year, month)})
+            elif year:
+                rows = coverage.refresh_months({(year, m) for m in range(1, 13)})
+            else:
+                rows = coverage.rebuild()
+            # bulk_create non emette segnali: il dashboard in cache va invalidato qui
+            transaction.on_commit(caching.bump_data_version)
+        self.stdout.write(self.style.SUCCESS(f"Riepiloghi mensili ricalcolati: {rows} righe"))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_alter_streetcleaningoperation_month_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('streets', 'Dati Strade'), ('areas', 'Definizioni Aree'), ('daily-activities', 'Attività Giornaliere'), ('area-definitions', 'Definizioni Aree e Operazioni')], max_length=30, verbose_name='Tipo')),
+                ('status', models.CharField(choices=[('pending', 'In attesa'), ('running', 'In corso'), ('success', 'Completata'), ('failed', 'Fallita')], default='pending', max_length=20, verbose_name='Stato')),
+                ('file_name', models.CharField(max_length=255, verbose_name='Nome File')),
+                ('file_path', models.CharField(max_length=500, verbose_name='Percorso File')),
+                ('parameters', models.JSONField(blank=True, default=dict, verbose_name='Parametri')),
+                ('sheets_total', models.PositiveIntegerField(default=0, verbose_name='Fogli Totali')),
+                ('sheets_processed', models.PositiveIntegerField(default=0, verbose_name='Fogli Elaborati')),
+                ('rows_processed', models.PositiveIntegerField(default=0, verbose_name='Righe Elaborate')),
+                ('warnings', models.JSONField(blank=True, default=list, verbose_name='Avvisi')),
+                ('result', models.JSONField(blank=True, default=dict, verbose_name='Esito')),
+                ('error', models.TextField(blank=True, verbose_name='Errore')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creato il')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Avviato il')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminato il')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Creato da')),
+            ],
+            options={
+                'verbose_name': 'Importazione',
+                'verbose_name_plural': 'Importazioni',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
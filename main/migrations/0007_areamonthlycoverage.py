@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AreaMonthlyCoverage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(verbose_name='Anno')),
+                ('month', models.PositiveIntegerField(verbose_name='Mese')),
+                ('total_streets', models.PositiveIntegerField(default=0, verbose_name='Strade Totali')),
+                ('covered_streets', models.PositiveIntegerField(default=0, verbose_name='Strade Coperte')),
+                ('work_order_count', models.PositiveIntegerField(default=0, verbose_name='Ordini di Lavoro')),
+                ('passage_sum', models.PositiveIntegerField(default=0, verbose_name='Passaggi Totali')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Aggiornato il')),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_coverage', to='main.area', verbose_name='Area')),
+            ],
+            options={
+                'verbose_name': 'Copertura Mensile Area',
+                'verbose_name_plural': 'Coperture Mensili Aree',
+                'indexes': [models.Index(fields=['year', 'month'], name='coverage_year_month_idx')],
+                'unique_together': {('area', 'year', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:28
+
+from datetime import date
+
+from django.db import migrations, models
+
+
+def backfill_dates(apps, schema_editor):
+    """Valorizza `date` con un UPDATE per ogni combinazione distinta di giorno, mese e anno"""
+    for model_name in ('StreetCleaningOperation', 'PassagePlan'):
+        model = apps.get_model('main', model_name)
+        combinations = (
+            model.objects.filter(day_of_month__isnull=False, month__isnull=False, year__isnull=False)
+            .values_list('year', 'month', 'day_of_month').distinct().order_by()
+        )
+        for year, month, day_of_month in list(combinations):
+            try:
+                value = date(year, month, day_of_month)
+            except ValueError:
+                continue
+            model.objects.filter(year=year, month=month, day_of_month=day_of_month).update(date=value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_areamonthlycoverage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='passageplan',
+            name='date',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True, verbose_name='Data'),
+        ),
+        migrations.AddField(
+            model_name='streetcleaningoperation',
+            name='date',
+            field=models.DateField(blank=True, db_index=True, editable=False, null=True, verbose_name='Data'),
+        ),
+        migrations.RunPython(backfill_dates, migrations.RunPython.noop),
+    ]
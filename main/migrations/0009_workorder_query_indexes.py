@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_operation_and_plan_dates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workorder',
+            index=models.Index(fields=['date', 'street'], name='workorder_date_street_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workorder',
+            index=models.Index(fields=['cleaning_machine', 'date'], name='workorder_machine_date_idx'),
+        ),
+    ]
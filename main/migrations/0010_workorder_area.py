@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_area(apps, schema_editor):
+    """Copia l'area della strada in ogni ordine di lavoro con un solo UPDATE"""
+    Street = apps.get_model('main', 'Street')
+    WorkOrder = apps.get_model('main', 'WorkOrder')
+    WorkOrder.objects.update(
+        area_id=models.Subquery(Street.objects.filter(pk=models.OuterRef('street_id')).values('area_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_workorder_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workorder',
+            name='area',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='work_orders', to='main.area', verbose_name='Area'),
+        ),
+        migrations.RunPython(backfill_area, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='workorder',
+            index=models.Index(fields=['area', 'date'], name='workorder_area_date_idx'),
+        ),
+    ]
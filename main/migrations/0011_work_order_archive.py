@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_workorder_area'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(verbose_name='Anno')),
+                ('month', models.PositiveIntegerField(verbose_name='Mese')),
+                ('work_order_count', models.PositiveIntegerField(default=0, verbose_name='Ordini di Lavoro')),
+                ('archived_at', models.DateTimeField(auto_now=True, verbose_name='Archiviato il')),
+            ],
+            options={
+                'verbose_name': 'Mese Archiviato',
+                'verbose_name_plural': 'Mesi Archiviati',
+                'unique_together': {('year', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedWorkOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('daily_passages', models.PositiveIntegerField(verbose_name='Passaggi Giornalieri')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('area', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main.area', verbose_name='Area')),
+                ('cleaning_machine', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main.cleaningmachine', verbose_name='Macchina Spazzatrice')),
+                ('created_by', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Creato da')),
+                ('street', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main.street', verbose_name='Strada')),
+            ],
+            options={
+                'verbose_name': 'Ordine di Lavoro Archiviato',
+                'verbose_name_plural': 'Ordini di Lavoro Archiviati',
+                'indexes': [models.Index(fields=['date', 'street'], name='archived_date_street_idx'), models.Index(fields=['area', 'date'], name='archived_area_date_idx')],
+                'unique_together': {('street', 'cleaning_machine', 'date')},
+            },
+        ),
+    ]
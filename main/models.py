@@ -1,5 +1,17 @@
+from datetime import date
+
+from django.core.cache import cache
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+def calendar_date(year, month, day_of_month):
+    """Data corrispondente ad anno, mese e giorno (None se incompleti o non validi, es. 31 giugno)"""
+    try:
+        return date(year, month, day_of_month)
+    except (TypeError, ValueError):
+        return None
 
 
 class CleaningMachine(models.Model):
@@ -61,6 +73,8 @@ class StreetCleaningOperation(models.Model):
     day_of_month = models.PositiveIntegerField(verbose_name="Giorno del Mese", null=True, blank=True)
     month = models.PositiveIntegerField(verbose_name="Mese", null=True, blank=True)
     year = models.PositiveIntegerField(verbose_name="Anno", null=True, blank=True)
+    # Ricavata da giorno, mese e anno per le ricerche per intervallo (indicizzata)
+    date = models.DateField(verbose_name="Data", null=True, blank=True, editable=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creata il")
     
     class Meta:
@@ -72,12 +86,21 @@ class StreetCleaningOperation(models.Model):
             models.CheckConstraint(check=models.Q(month__gte=1) & models.Q(month__lte=12), name='valid_operation_month'),
         ]
     
+    def save(self, *args, **kwargs):
+        self.date = calendar_date(self.year, self.month, self.day_of_month)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.street.name} - {self.operation_type.name} - {self.day_of_month}/{self.month}/{self.year}"
 
 
 class WorkOrder(models.Model):
     street = models.ForeignKey(Street, on_delete=models.CASCADE, verbose_name="Strada")
+    # Copia di street.area per le query per area senza join (indice area, data)
+    area = models.ForeignKey(
+        Area, on_delete=models.CASCADE, related_name='work_orders', verbose_name="Area",
+        null=True, editable=False, db_index=False,
+    )
     cleaning_machine = models.ForeignKey(CleaningMachine, on_delete=models.CASCADE, verbose_name="Macchina Spazzatrice")
     daily_passages = models.PositiveIntegerField(verbose_name="Passaggi Giornalieri")
     date = models.DateField(verbose_name="Data")
@@ -89,17 +112,98 @@ class WorkOrder(models.Model):
         verbose_name = "Ordine di Lavoro"
         verbose_name_plural = "Ordini di Lavoro"
         unique_together = ['street', 'cleaning_machine', 'date']
+        indexes = [
+            # Intervalli di date per via/area (dashboard, area_view, riepiloghi, conformità)
+            models.Index(fields=['date', 'street'], name='workorder_date_street_idx'),
+            # Intervalli di date per macchina (importazione giornaliera, utilizzo macchine)
+            models.Index(fields=['cleaning_machine', 'date'], name='workorder_machine_date_idx'),
+            # Aggregazioni e dettagli per area e intervallo di date
+            models.Index(fields=['area', 'date'], name='workorder_area_date_idx'),
+        ]
     
+    def save(self, *args, **kwargs):
+        self.area_id = self.street.area_id
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.street.name} - {self.cleaning_machine.name} - {self.date}"
 
 
+class ArchivedWorkOrder(models.Model):
+    """Ordine di lavoro di un mese chiuso, spostato da WorkOrder da main.archive.
+
+    Conserva l'id originale e solo i campi usati da viste e report.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    street = models.ForeignKey(Street, on_delete=models.CASCADE, related_name='+', verbose_name="Strada")
+    area = models.ForeignKey(Area, on_delete=models.CASCADE, related_name='+', verbose_name="Area", db_index=False)
+    cleaning_machine = models.ForeignKey(
+        CleaningMachine, on_delete=models.CASCADE, related_name='+', verbose_name="Macchina Spazzatrice", db_index=False,
+    )
+    daily_passages = models.PositiveIntegerField(verbose_name="Passaggi Giornalieri")
+    date = models.DateField(verbose_name="Data")
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name="Creato da", db_index=False)
+
+    class Meta:
+        verbose_name = "Ordine di Lavoro Archiviato"
+        verbose_name_plural = "Ordini di Lavoro Archiviati"
+        unique_together = ['street', 'cleaning_machine', 'date']
+        indexes = [
+            models.Index(fields=['date', 'street'], name='archived_date_street_idx'),
+            models.Index(fields=['area', 'date'], name='archived_area_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.street.name} - {self.cleaning_machine.name} - {self.date} (archiviato)"
+
+
+class ArchivedMonth(models.Model):
+    """Mese i cui ordini di lavoro si trovano in ArchivedWorkOrder"""
+    year = models.PositiveIntegerField(verbose_name="Anno")
+    month = models.PositiveIntegerField(verbose_name="Mese")
+    work_order_count = models.PositiveIntegerField(default=0, verbose_name="Ordini di Lavoro")
+    archived_at = models.DateTimeField(auto_now=True, verbose_name="Archiviato il")
+
+    class Meta:
+        verbose_name = "Mese Archiviato"
+        verbose_name_plural = "Mesi Archiviati"
+        unique_together = ['year', 'month']
+
+    def __str__(self):
+        return f"{self.month}/{self.year} ({self.work_order_count} ordini)"
+
+
+class AreaMonthlyCoverage(models.Model):
+    """Riepilogo mensile delle lavorazioni di un'area, mantenuto da main.coverage"""
+    area = models.ForeignKey(Area, on_delete=models.CASCADE, related_name='monthly_coverage', verbose_name="Area")
+    year = models.PositiveIntegerField(verbose_name="Anno")
+    month = models.PositiveIntegerField(verbose_name="Mese")
+    total_streets = models.PositiveIntegerField(default=0, verbose_name="Strade Totali")
+    covered_streets = models.PositiveIntegerField(default=0, verbose_name="Strade Coperte")
+    work_order_count = models.PositiveIntegerField(default=0, verbose_name="Ordini di Lavoro")
+    passage_sum = models.PositiveIntegerField(default=0, verbose_name="Passaggi Totali")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Aggiornato il")
+
+    class Meta:
+        verbose_name = "Copertura Mensile Area"
+        verbose_name_plural = "Coperture Mensili Aree"
+        unique_together = ['area', 'year', 'month']
+        indexes = [
+            models.Index(fields=['year', 'month'], name='coverage_year_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.area.name} - {self.month}/{self.year} ({self.covered_streets}/{self.total_streets} strade)"
+
+
 class PassagePlan(models.Model):
     cleaning_machine = models.ForeignKey(CleaningMachine, on_delete=models.CASCADE, verbose_name="Macchina Spazzatrice")
     day_of_month = models.PositiveIntegerField(verbose_name="Giorno del Mese")
     required_passages = models.PositiveIntegerField(verbose_name="Passaggi Richiesti")
     month = models.PositiveIntegerField(verbose_name="Mese")
     year = models.PositiveIntegerField(verbose_name="Anno")
+    # Ricavata da giorno, mese e anno per le ricerche per intervallo (indicizzata)
+    date = models.DateField(verbose_name="Data", null=True, blank=True, editable=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creato il")
     
     class Meta:
@@ -111,5 +215,100 @@ class PassagePlan(models.Model):
             models.CheckConstraint(check=models.Q(month__gte=1) & models.Q(month__lte=12), name='valid_month'),
         ]
     
+    def save(self, *args, **kwargs):
+        self.date = calendar_date(self.year, self.month, self.day_of_month)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.cleaning_machine.name} - {self.day_of_month}/{self.month}/{self.year} - {self.required_passages} passaggi"
+
+
+class ImportJob(models.Model):
+    KIND_CHOICES = [
+        ('streets', 'Dati Strade'),
+        ('areas', 'Definizioni Aree'),
+        ('daily-activities', 'Attività Giornaliere'),
+        ('area-definitions', 'Definizioni Aree e Operazioni'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'In attesa'),
+        ('running', 'In corso'),
+        ('success', 'Completata'),
+        ('failed', 'Fallita'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES, verbose_name="Tipo")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Stato")
+    file_name = models.CharField(max_length=255, verbose_name="Nome File")
+    file_path = models.CharField(max_length=500, verbose_name="Percorso File")
+    parameters = models.JSONField(default=dict, blank=True, verbose_name="Parametri")
+    sheets_total = models.PositiveIntegerField(default=0, verbose_name="Fogli Totali")
+    sheets_processed = models.PositiveIntegerField(default=0, verbose_name="Fogli Elaborati")
+    rows_processed = models.PositiveIntegerField(default=0, verbose_name="Righe Elaborate")
+    warnings = models.JSONField(default=list, blank=True, verbose_name="Avvisi")
+    result = models.JSONField(default=dict, blank=True, verbose_name="Esito")
+    error = models.TextField(blank=True, verbose_name="Errore")
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Creato da")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Creato il")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Avviato il")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Terminato il")
+
+    class Meta:
+        verbose_name = "Importazione"
+        verbose_name_plural = "Importazioni"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.file_name} ({self.get_status_display()})"
+
+    @property
+    def rows_per_second(self):
+        if not self.started_at:
+            return 0
+        elapsed = ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+        return round(self.rows_processed / elapsed, 1) if elapsed > 0 else 0
+
+    # Interfaccia di avanzamento usata dalle funzioni run_*_import. L'importazione scrive
+    # dentro una transazione, quindi l'avanzamento viene pubblicato nella cache e salvato
+    # nel database solo al termine del job.
+    PROGRESS_FIELDS = ('sheets_total', 'sheets_processed', 'rows_processed')
+
+    @property
+    def progress_cache_key(self):
+        return f'import-job-progress:{self.id}'
+
+    def start(self, sheets_total):
+        self.sheets_total = sheets_total
+        self.publish_progress()
+
+    def advance(self, sheets=0, rows=0):
+        self.sheets_processed += sheets
+        self.rows_processed += rows
+        self.publish_progress()
+
+    def publish_progress(self):
+        cache.set(self.progress_cache_key, {field: getattr(self, field) for field in self.PROGRESS_FIELDS})
+
+    def load_progress(self):
+        """Aggiorna i contatori di un job in corso con l'avanzamento pubblicato dal worker"""
+        if self.status == 'running':
+            for field, value in (cache.get(self.progress_cache_key) or {}).items():
+                setattr(self, field, value)
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'file_name': self.file_name,
+            'sheets_total': self.sheets_total,
+            'sheets_processed': self.sheets_processed,
+            'rows_processed': self.rows_processed,
+            'rows_per_second': self.rows_per_second,
+            'warnings': self.warnings,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -0,0 +1,207 @@
+"""Analisi dei fogli Excel in record semplici, senza accesso al database.
+
+Il modulo non importa Django, così le funzioni possono girare nei processi del pool
+di `parse_definitions_workbook` (avviati con il metodo "spawn").
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from .workbook import Workbook
+
+# Fogli minimi per ogni processo di `parse_definitions_workbook`: ogni processo riapre la
+# cartella (circa 2,2 s per docs/in/definitions.xlsx) e legge un foglio in circa 0,11 s,
+# quindi un processo in più conviene solo con almeno una ventina di fogli da leggere
+MIN_SHEETS_PER_WORKER = 20
+
+
+def find_day_columns(df, day_row=2):
+    """Restituisce (posizioni colonna, giorni) delle celle della riga `day_row` con un giorno valido (1-31)"""
+    days = np.trunc(pd.to_numeric(df.iloc[day_row], errors='coerce').to_numpy(dtype=float))
+    columns = np.flatnonzero((days >= 1) & (days <= 31))
+    return columns, days[columns].astype(np.int64)
+
+
+def extract_day_grid(df, columns, days, first_row=3):
+    """Estrae la matrice via x giorno di un foglio giornaliera in forma lunga.
+
+    Restituisce (nomi vie, griglia): la griglia è un array int64 di righe
+    (indice via, giorno, passaggi) con le sole celle numeriche e positive, in ordine
+    di riga e poi di colonna; l'indice via punta alla lista dei nomi.
+    """
+    names = df.iloc[first_row:, 0].map(str).str.strip()
+    valid = ~names.str.lower().isin(['nan', 'none', ''])
+    street_names = names[valid].tolist()
+
+    block = df.iloc[first_row:, columns][valid.to_numpy()]
+    passages = np.trunc(block.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float))
+    street_idx, day_idx = np.nonzero(np.isfinite(passages) & (passages > 0))
+
+    grid = np.column_stack([
+        street_idx,
+        days[day_idx],
+        passages[street_idx, day_idx],
+    ]).astype(np.int64)
+    return street_names, grid
+
+
+def parse_definition_sheet(sheet_name, df):
+    """Estrae da un foglio area di definitions.xlsx i tipi di operazione, il periodo e le vie.
+
+    Restituisce un dizionario con:
+    - `skip`: messaggio se il foglio va scartato senza creare l'area (vuoto o troppo corto);
+    - `operation_headers`: (nome, frequenza) di ogni intestazione di operazione trovata;
+    - `default_operation`: True se non c'erano intestazioni e si usa "Spazzamento Standard";
+    - `error`: messaggio se manca la riga VIE (area e tipi operazione vanno comunque creati);
+    - `year`, `month` e `streets`: [(nome via, [(nome operazione, giorno)])].
+    """
+    record = {
+        'sheet': sheet_name,
+        'rows': len(df),
+        'skip': None,
+        'operation_headers': [],
+        'default_operation': False,
+        'error': None,
+        'year': 2025,  # Default year
+        'month': 6,    # Default month (June)
+        'streets': [],
+    }
+    if df.empty or len(df) < 8:
+        record['skip'] = f"Foglio '{sheet_name}' troppo piccolo o vuoto"
+        return record
+
+    values = df.to_numpy(dtype=object)
+    n_rows, n_cols = values.shape
+
+    # Find operation descriptions (usually around rows 5-6)
+    operation_columns = {}
+    for row_idx in range(min(15, n_rows)):
+        for col_idx in range(n_cols):
+            cell_value = values[row_idx, col_idx]
+            if pd.notna(cell_value):
+                cell_str = str(cell_value).strip()
+                # Look for operation patterns like "Spazzamento meccanizzato (1/SETTIMANA)"
+                if 'spazzamento' in cell_str.lower() and 'settimana' in cell_str.lower():
+                    freq_match = re.search(r'\((\d+)/SETTIMANA\)', cell_str.upper())
+                    frequency = int(freq_match.group(1)) if freq_match else 1
+                    record['operation_headers'].append((cell_str, frequency))
+                    operation_columns[col_idx] = cell_str
+
+    # If no specific operation types found, use a default one
+    if not operation_columns:
+        record['default_operation'] = True
+        operation_columns[10] = "Spazzamento Standard"  # Default to column 10
+    first_operation = next(iter(operation_columns.values()))
+
+    # Find the VIE row
+    vie_row_idx = None
+    for idx in range(n_rows):
+        if str(values[idx, 0]).strip().upper() == 'VIE':
+            vie_row_idx = idx
+            break
+
+    if vie_row_idx is None:
+        record['error'] = f"Riga VIE non trovata nel foglio '{sheet_name}'"
+        return record
+
+    # Extract year and month (usually in first few rows)
+    for row_idx in range(min(5, n_rows)):
+        for col_idx in range(n_cols):
+            cell_value = values[row_idx, col_idx]
+            if pd.notna(cell_value):
+                cell_str = str(cell_value)
+                if cell_str.strip().isdigit() and len(cell_str) == 4:
+                    year_val = int(cell_str)
+                    if 2020 <= year_val <= 2030:
+                        record['year'] = year_val
+                elif cell_str.strip() in ['GIU', 'GIUGNO']:
+                    record['month'] = 6
+                elif cell_str.strip() in ['LUG', 'LUGLIO']:
+                    record['month'] = 7
+
+    # Process streets starting from vie_row_idx + 1
+    for street_row_idx in range(vie_row_idx + 1, n_rows):
+        street_name = values[street_row_idx, 0]
+        if pd.isna(street_name):
+            continue
+
+        street_name = str(street_name).strip()
+        if not street_name or street_name.upper() == 'VIE':
+            continue
+
+        # Clean street name (remove asterisks and extra characters)
+        clean_street_name = re.sub(r'[*]+$', '', street_name).strip()
+        if not clean_street_name:
+            continue
+
+        operations = []
+        for col_idx in range(1, min(32, n_cols)):
+            cell_value = values[street_row_idx, col_idx]
+            if pd.notna(cell_value) and str(cell_value).strip():
+                try:
+                    # Try to interpret as day of month
+                    day_of_month = int(float(str(cell_value).strip()))
+                except (ValueError, TypeError):
+                    continue
+                if 1 <= day_of_month <= 31:
+                    operations.append((operation_columns.get(col_idx, first_operation), day_of_month))
+        record['streets'].append((clean_street_name, operations))
+
+    return record
+
+
+def parse_definition_sheets(sheets):
+    """Analizza i fogli area [(posizione, nome, DataFrame)]. Restituisce [(posizione, record)]"""
+    parsed = []
+    for position, sheet_name, df in sheets:
+        try:
+            record = parse_definition_sheet(sheet_name, df)
+        except Exception as e:
+            record = {
+                'sheet': sheet_name,
+                'rows': len(df),
+                'skip': f"Errore nell'elaborazione del foglio '{sheet_name}': {str(e)}",
+            }
+        parsed.append((position, record))
+    return parsed
+
+
+def read_definition_sheets(source, sheets):
+    """Legge e analizza i fogli area [(posizione, nome)] di `source` (eseguita nei processi del pool)"""
+    with Workbook(source) as workbook:
+        frames = workbook.sheets([name for _, name in sheets])
+    return parse_definition_sheets([(position, name, frames[name]) for position, name in sheets])
+
+
+def parse_definitions_workbook(source, workers=1):
+    """Analizza tutti i fogli area di definitions.xlsx (il primo, QUADRO GENERALE, viene saltato).
+
+    La parte costosa è la lettura dei fogli con openpyxl, non la loro analisi. Con un
+    solo worker la cartella viene letta una volta nel processo corrente; con più worker
+    (solo se `source` è un percorso) ogni processo del pool riapre il file e legge i
+    propri fogli, purché a ciascuno ne restino almeno MIN_SHEETS_PER_WORKER. I record
+    vengono restituiti nell'ordine dei fogli.
+    """
+    with Workbook(source) as workbook:
+        names = workbook.sheet_names[1:]
+        if isinstance(source, (str, os.PathLike)):
+            workers = min(workers or 1, len(names) // MIN_SHEETS_PER_WORKER)
+        else:
+            workers = 1
+        if workers <= 1:
+            frames = workbook.sheets(names)
+    sheets = list(enumerate(names, start=1))
+
+    if workers <= 1:
+        parsed = parse_definition_sheets([(position, name, frames[name]) for position, name in sheets])
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as executor:
+            chunks = executor.map(
+                read_definition_sheets, [source] * workers, [sheets[index::workers] for index in range(workers)],
+            )
+            parsed = [item for chunk in chunks for item in chunk]
+    return [record for _, record in sorted(parsed, key=lambda item: item[0])]
@@ -0,0 +1,79 @@
+"""Risoluzione nome -> id delle entità di riferimento durante un'importazione."""
+from .models import Area, CleaningMachine, CleaningOperationType, Street
+
+
+class ReferenceResolver:
+    """Cache delle entità di riferimento valida per una singola importazione.
+
+    Al primo utilizzo di un modello carica tutti i record esistenti con una sola query;
+    le voci mancanti vengono create con un'unica `bulk_create` per chiamata e gli id
+    vengono poi restituiti dalla memoria. Le strade sono indicizzate per (area_id, nome),
+    gli altri modelli per nome.
+
+    Il confronto tra nomi è quello del database: con le collation di MySQL che non
+    distinguono maiuscole, accenti e spazi finali una voce del file può corrispondere a
+    un record salvato con un nome diverso; la sua INSERT viene ignorata e l'id viene
+    cercato con una query su quella voce, senza confronti in Python.
+    """
+
+    KEY_FIELDS = {
+        Area: ('name',),
+        CleaningMachine: ('name',),
+        CleaningOperationType: ('name',),
+        Street: ('area_id', 'name'),
+    }
+
+    def __init__(self):
+        self._ids = {}
+        self._created = {}
+
+    def _key(self, model, values):
+        return values[0] if len(self.KEY_FIELDS[model]) == 1 else tuple(values)
+
+    def _load(self, model):
+        if model not in self._ids:
+            fields = self.KEY_FIELDS[model]
+            self._ids[model] = {
+                self._key(model, row[:-1]): row[-1]
+                for row in model.objects.values_list(*fields, 'id')
+            }
+        return self._ids[model]
+
+    def resolve(self, model, entries):
+        """Restituisce {chiave: id} per le chiavi di `entries`, creando quelle mancanti.
+
+        `entries` è un dizionario {chiave: defaults} (o un iterabile di chiavi): i defaults
+        vengono usati solo per i record da creare.
+        """
+        if not isinstance(entries, dict):
+            entries = dict.fromkeys(entries)
+        ids = self._load(model)
+        missing = [key for key in entries if key not in ids]
+        if missing:
+            fields = self.KEY_FIELDS[model]
+            model.objects.bulk_create(
+                [
+                    model(**dict(zip(fields, key if len(fields) > 1 else (key,))), **(entries[key] or {}))
+                    for key in missing
+                ],
+                ignore_conflicts=True,
+            )
+            lookup = {f'{field}__in': {key[i] if len(fields) > 1 else key for key in missing}
+                      for i, field in enumerate(fields)}
+            for row in model.objects.filter(**lookup).values_list(*fields, 'id'):
+                ids.setdefault(self._key(model, row[:-1]), row[-1])
+
+            created = self._created.setdefault(model, [])
+            for key in missing:
+                if key in ids:
+                    created.append(key)
+                    continue
+                # Già presente con un nome equivalente per la collation: la INSERT è stata ignorata
+                ids[key] = model.objects.filter(
+                    **dict(zip(fields, key if len(fields) > 1 else (key,)))
+                ).values_list('id', flat=True).get()
+        return {key: ids[key] for key in entries}
+
+    def created(self, model):
+        """Chiavi create da questo resolver per `model`, nell'ordine di creazione"""
+        return list(self._created.get(model, []))
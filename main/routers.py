@@ -0,0 +1,102 @@
+"""Instradamento delle letture delle viste di consultazione verso un database replica.
+
+Le viste di sola lettura (dashboard, vista area, report) decorate con `replica_view`
+vengono eseguite dentro `replica_reads()`: in quel blocco `ReplicaRouter` manda le
+letture all'alias DATABASE_REPLICA. Scritture, importazioni, admin e comandi di
+gestione restano sempre sul database principale ('default').
+
+Dopo aver avviato un'importazione la sessione legge dal principale finché il job non è
+terminato da almeno DATABASE_REPLICA_LAG secondi, così l'utente vede subito i dati
+che ha appena importato anche se la replica è in ritardo.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.utils import timezone
+
+# Job di importazione avviati dalla sessione che tengono le letture sul principale
+STICKY_JOBS_SESSION_KEY = 'primary-import-jobs'
+
+_state = threading.local()
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Manda alla replica (se configurata) le letture eseguite nel blocco"""
+    previous = getattr(_state, 'replica', False)
+    _state.replica = enabled
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+def reading_from_replica():
+    return bool(settings.DATABASE_REPLICA and getattr(_state, 'replica', False))
+
+
+class ReplicaRouter:
+    """Letture alla replica dentro `replica_reads()`, tutto il resto al database principale"""
+
+    def db_for_read(self, model, **hints):
+        if reading_from_replica():
+            return settings.DATABASE_REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Anche gli oggetti letti dalla replica si salvano sul principale
+        if settings.DATABASE_REPLICA:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Principale e replica contengono gli stessi dati
+        databases = {DEFAULT_DB_ALIAS, settings.DATABASE_REPLICA}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+def stick_to_primary(request, job):
+    """Tiene sul principale le letture della sessione fino al termine dell'importazione `job`"""
+    request.session[STICKY_JOBS_SESSION_KEY] = [*request.session.get(STICKY_JOBS_SESSION_KEY, []), job.id]
+
+
+def is_sticky(request):
+    """True se la sessione ha importazioni in corso o terminate da meno di DATABASE_REPLICA_LAG secondi"""
+    job_ids = request.session.get(STICKY_JOBS_SESSION_KEY)
+    if not job_ids:
+        return False
+    from .jobs import stale_jobs
+    from .models import ImportJob
+
+    settled = timezone.now() - timedelta(seconds=settings.DATABASE_REPLICA_LAG)
+    # I job rimasti senza fine oltre IMPORT_JOB_TIMEOUT sono interrotti (vedi main.jobs)
+    pending = list(
+        ImportJob.objects.filter(id__in=job_ids)
+        .filter(Q(finished_at__isnull=True) | Q(finished_at__gt=settled))
+        .exclude(id__in=stale_jobs())
+        .values_list('id', flat=True)
+    )
+    if len(pending) != len(job_ids):
+        if pending:
+            request.session[STICKY_JOBS_SESSION_KEY] = pending
+        else:
+            del request.session[STICKY_JOBS_SESSION_KEY]
+    return bool(pending)
+
+
+def replica_view(view):
+    """Esegue la vista di sola lettura con le letture sulla replica, salvo sessioni "sticky" """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not settings.DATABASE_REPLICA:
+            return view(request, *args, **kwargs)
+        with replica_reads(not is_sticky(request)):
+            return view(request, *args, **kwargs)
+    return wrapper
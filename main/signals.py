@@ -0,0 +1,82 @@
+"""Reazioni alle modifiche singole dei dati (admin, shell).
+
+- aggiornamento della tabella AreaMonthlyCoverage alla conferma della transazione
+  (`coverage.deferred_until_commit()`); le scritture massive delle importazioni non
+  emettono segnali, quindi le importazioni segnalano i mesi toccati direttamente a
+  `coverage.deferred()`;
+- allineamento di WorkOrder.area (e ArchivedWorkOrder.area) quando una strada cambia area;
+- incremento della versione dei dati della cache delle viste (`main.caching`).
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import caching, coverage
+from .models import (
+    ArchivedWorkOrder, Area, CleaningMachine, CleaningOperationType, PassagePlan, Street,
+    StreetCleaningOperation, WorkOrder,
+)
+
+
+@receiver(pre_save, sender=WorkOrder)
+def remember_work_order_date(sender, instance, raw=False, **kwargs):
+    # Se l'ordine cambia mese va ricalcolato anche il mese di partenza
+    instance._coverage_previous_date = None
+    if instance.pk and not raw:
+        instance._coverage_previous_date = (
+            WorkOrder.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=WorkOrder)
+@receiver(post_delete, sender=WorkOrder)
+def work_order_changed(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    with coverage.deferred_until_commit(using) as changes:
+        changes.mark_date(instance.date)
+        changes.mark_date(getattr(instance, '_coverage_previous_date', None))
+
+
+@receiver(pre_save, sender=Street)
+def remember_street_area(sender, instance, raw=False, **kwargs):
+    instance._coverage_previous_area_id = None
+    if instance.pk and not raw:
+        instance._coverage_previous_area_id = (
+            Street.objects.filter(pk=instance.pk).values_list('area_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Street)
+@receiver(post_delete, sender=Street)
+def street_changed(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    previous_area_id = getattr(instance, '_coverage_previous_area_id', None)
+    with coverage.deferred_until_commit(using) as changes:
+        changes.mark_streets({instance.area_id, previous_area_id} - {None})
+        if previous_area_id is not None and previous_area_id != instance.area_id:
+            # Strada spostata: gli ordini, anche quelli archiviati, seguono la nuova area
+            # e i loro mesi vanno ricalcolati per entrambe le aree
+            for work_orders in (WorkOrder.objects.filter(street=instance),
+                                ArchivedWorkOrder.objects.filter(street=instance)):
+                work_orders.update(area_id=instance.area_id)
+                for month in work_orders.dates('date', 'month'):
+                    changes.mark_date(month)
+
+
+@receiver(post_save, sender=WorkOrder)
+@receiver(post_delete, sender=WorkOrder)
+@receiver(post_save, sender=Street)
+@receiver(post_delete, sender=Street)
+@receiver(post_save, sender=StreetCleaningOperation)
+@receiver(post_delete, sender=StreetCleaningOperation)
+@receiver(post_save, sender=Area)
+@receiver(post_delete, sender=Area)
+@receiver(post_save, sender=CleaningMachine)
+@receiver(post_delete, sender=CleaningMachine)
+@receiver(post_save, sender=CleaningOperationType)
+@receiver(post_delete, sender=CleaningOperationType)
+@receiver(post_save, sender=PassagePlan)
+@receiver(post_delete, sender=PassagePlan)
+def data_changed(sender, **kwargs):
+    caching.bump_data_version_on_commit()
@@ -1,3 +1,532 @@
-from django.test import TestCase
+import os
+import re
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from tempfile import NamedTemporaryFile
+from unittest.mock import patch
 
-# Create your tests here.
+import numpy as np
+import openpyxl
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import Count, Q, Sum
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import archive, caching
+from .importers import NullProgress, run_area_definitions_import, run_daily_activities_import
+from .jobs import RUNNERS, recover_stale_jobs, run_job
+from .area_report import area_report
+from .compliance import compare
+from .models import (
+    Area, ArchivedMonth, ArchivedWorkOrder, CleaningMachine, ImportJob, Street, StreetCleaningOperation, WorkOrder,
+)
+from .schedule import generate_schedule
+from .routers import STICKY_JOBS_SESSION_KEY, is_sticky, replica_reads
+
+
+class WorkOrderQueryPlanTests(TestCase):
+    """Le query più frequenti sugli ordini di lavoro devono usare un indice.
+
+    Il piano viene letto con EXPLAIN sul database SQLite (alias 'sqlite'), quindi il test
+    non richiede il server MySQL.
+    """
+    databases = {'sqlite'}
+
+    start = date(2025, 7, 1)
+    end = date(2025, 7, 31)
+
+    def hot_queries(self):
+        work_orders = WorkOrder.objects.using('sqlite')
+        month = work_orders.filter(date__range=(self.start, self.end))
+        area_range = work_orders.filter(area_id=1, date__range=(self.start, self.end))
+        return {
+            # main.dashboard.area_overview
+            'dashboard': month.values_list('area_id', 'date')
+            .annotate(count=Count('id'), passages=Sum('daily_passages')).order_by(),
+            # main.dashboard.work_order_page (dettaglio settimane e area_view)
+            'work_order_page': area_range.select_related('street', 'cleaning_machine')
+            .filter(Q(date__gt=self.start) | Q(date=self.start, id__gt=1)).order_by('date', 'id')[:51],
+            # main.validators (sonde di dashboard e area_view: stesso filtro di Max/Count)
+            'dashboard_probe': month.values_list('updated_at').order_by(),
+            'area_view_probe': area_range.values_list('updated_at').order_by(),
+            # main.area_report
+            'area_report': area_range.values_list('street_id', 'date', 'cleaning_machine_id')
+            .annotate(count=Count('id'), passages=Sum('daily_passages')).order_by(),
+            # main.coverage.refresh_months
+            'coverage': work_orders.filter(date__gte=self.start, date__lt=date(2025, 8, 1))
+            .values_list('area_id').annotate(count=Count('id')).order_by(),
+            # main.utilization
+            'utilization': month.values_list('cleaning_machine_id', 'date')
+            .annotate(passages=Sum('daily_passages')).order_by(),
+            # main.importers.run_daily_activities_import (righe esistenti per macchina e mese)
+            'daily_import': work_orders.filter(
+                cleaning_machine_id__in=[1, 2], date__gte=self.start, date__lte=self.end,
+            ).values_list('id', 'street_id', 'cleaning_machine_id', 'date', 'daily_passages'),
+        }
+
+    def test_hot_queries_do_not_scan_work_orders(self):
+        self.assertEqual(connections['sqlite'].vendor, 'sqlite')
+        table = WorkOrder._meta.db_table
+        for name, queryset in self.hot_queries().items():
+            with self.subTest(query=name):
+                plan = queryset.explain()
+                self.assertIsNone(
+                    re.search(rf'\bSCAN {table}\b', plan),
+                    f"La query '{name}' legge l'intera tabella {table}:\n{plan}",
+                )
+
+    def test_area_queries_use_area_date_index(self):
+        """Le query per area leggono solo l'indice (area, data) di WorkOrder, senza join su Street"""
+        queries = self.hot_queries()
+        for name in ('work_order_page', 'area_view_probe', 'area_report'):
+            with self.subTest(query=name):
+                plan = queries[name].explain()
+                self.assertIn('USING INDEX workorder_area_date_idx', plan)
+                self.assertNotIn('main_street USING INDEX', plan)
+
+
+@override_settings(DATABASE_REPLICA='sqlite')
+class ReplicaRoutingTests(TestCase):
+    """Letture delle viste di consultazione sulla replica, scritture e importazioni sul principale.
+
+    Principale e replica non sono sincronizzati (es. due file SQLite con
+    gestione_giornaliere.settings_sqlite): un'area presente in uno solo dei due indica
+    da quale database legge la vista.
+    """
+    databases = {'default', 'sqlite'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('operatore', password='password')
+        self.client.force_login(self.user)
+        Area.objects.create(name='Area principale')
+        Area.objects.using('sqlite').create(name='Area replica')
+
+    def dashboard(self):
+        return self.client.get(reverse('dashboard'), {'year': 2025, 'month': 7})
+
+    def test_read_only_views_read_from_replica(self):
+        response = self.dashboard()
+        self.assertContains(response, 'Area replica')
+        self.assertNotContains(response, 'Area principale')
+
+    def test_writes_go_to_primary(self):
+        with replica_reads():
+            self.assertEqual(list(Area.objects.values_list('name', flat=True)), ['Area replica'])
+            Area.objects.create(name='Nuova area')
+        self.assertTrue(Area.objects.filter(name='Nuova area').exists())
+        self.assertFalse(Area.objects.using('sqlite').filter(name='Nuova area').exists())
+
+    def test_session_reads_primary_after_import(self):
+        upload = SimpleUploadedFile('giornaliera.xlsx', b'contenuto')
+        response = self.client.post(reverse('import_daily_activities'), {'excel_file': upload})
+        job = ImportJob.objects.get(id=response.json()['job_id'])
+        self.addCleanup(os.remove, job.file_path)
+
+        # Job in corso o appena terminato: la sessione vede i dati del principale
+        self.assertContains(self.dashboard(), 'Area principale')
+        job.status, job.finished_at = 'success', timezone.now()
+        job.save()
+        cache.clear()
+        self.assertContains(self.dashboard(), 'Area principale')
+
+        # Trascorso il ritardo della replica si torna a leggere dalla replica
+        job.finished_at = timezone.now() - timedelta(minutes=1)
+        job.save()
+        cache.clear()
+        self.assertContains(self.dashboard(), 'Area replica')
+        self.assertNotIn(STICKY_JOBS_SESSION_KEY, self.client.session)
+
+    def test_replica_data_not_cached_right_after_a_change(self):
+        caching.bump_data_version()
+        with replica_reads():
+            caching.cached_view_data('test', {}, lambda: 'replica')
+        self.assertEqual(caching.cached_view_data('test', {}, lambda: 'principale'), 'principale')
+
+
+class WorkOrderArchiveTests(TestCase):
+    """Archiviazione e ripristino di un mese di ordini di lavoro (main.archive)"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('operatore')
+        self.area = Area.objects.create(name='Area 1')
+        self.other_area = Area.objects.create(name='Area 2')
+        self.machine = CleaningMachine.objects.create(name='Spazzatrice 1')
+        self.streets = [Street.objects.create(name=f'Via {i}', area=self.area) for i in range(2)]
+        for street in self.streets:
+            for day in (1, 2):
+                WorkOrder.objects.create(
+                    street=street, cleaning_machine=self.machine, date=date(2025, 7, day),
+                    daily_passages=1, created_by=self.user,
+                )
+        archive.archive_month(2025, 7)
+
+    def test_moved_street_moves_archived_orders(self):
+        street = self.streets[0]
+        street.area = self.other_area
+        street.save()
+        self.assertEqual(
+            set(ArchivedWorkOrder.objects.filter(street=street).values_list('area_id', flat=True)), {self.other_area.id},
+        )
+        call_command('check_work_order_areas', stdout=StringIO())
+        report = area_report(self.other_area, date(2025, 7, 1), date(2025, 7, 31))
+        self.assertEqual(report['summary']['work_orders'], 2)
+
+        archive.restore_month(2025, 7)
+        self.assertEqual(
+            set(WorkOrder.objects.filter(street=street).values_list('area_id', flat=True)), {self.other_area.id},
+        )
+
+    def test_restore_keeps_orders_written_after_archiving(self):
+        # Ordine modificato e ordine nuovo inseriti dall'admin nel mese archiviato
+        edited = WorkOrder.objects.create(
+            street=self.streets[0], cleaning_machine=self.machine, date=date(2025, 7, 1),
+            daily_passages=5, created_by=self.user,
+        )
+        WorkOrder.objects.create(
+            street=self.streets[0], cleaning_machine=self.machine, date=date(2025, 7, 3),
+            daily_passages=2, created_by=self.user,
+        )
+
+        restored = archive.restore_month(2025, 7)
+
+        self.assertEqual(restored, 3)
+        self.assertFalse(ArchivedWorkOrder.objects.exists())
+        self.assertFalse(ArchivedMonth.objects.exists())
+        self.assertEqual(WorkOrder.objects.count(), 5)
+        edited.refresh_from_db()
+        self.assertEqual(edited.daily_passages, 5)
+        coverage = self.area.monthly_coverage.get(year=2025, month=7)
+        self.assertEqual((coverage.work_order_count, coverage.passage_sum), (5, 10))
+
+
+class AreaReportTests(TestCase):
+    def test_orders_of_streets_moved_without_signals_are_skipped(self):
+        user = User.objects.create_user('operatore')
+        area, other_area = Area.objects.create(name='Area 1'), Area.objects.create(name='Area 2')
+        machine = CleaningMachine.objects.create(name='Spazzatrice 1')
+        streets = [Street.objects.create(name=f'Via {i}', area=area) for i in range(2)]
+        for street in streets:
+            WorkOrder.objects.create(
+                street=street, cleaning_machine=machine, date=date(2025, 7, 1), daily_passages=1, created_by=user,
+            )
+        # update() non emette segnali: WorkOrder.area resta quella precedente
+        Street.objects.filter(id=streets[1].id).update(area=other_area)
+
+        with self.assertLogs('main.area_report', 'WARNING'):
+            report = area_report(area, date(2025, 7, 1), date(2025, 7, 31))
+        self.assertEqual([row['street'] for row in report['rows']], [streets[0]])
+        self.assertEqual(report['summary'], {'work_orders': 1, 'passages': 1, 'machines': 1, 'streets_covered': 1})
+
+
+class CoverageSignalTests(TestCase):
+    def test_work_order_saved_with_string_date_updates_coverage(self):
+        user = User.objects.create_user('operatore')
+        area = Area.objects.create(name='Area 1')
+        machine = CleaningMachine.objects.create(name='Spazzatrice 1')
+        with self.captureOnCommitCallbacks(execute=True):
+            street = Street.objects.create(name='Via 1', area=area)
+            WorkOrder(street=street, cleaning_machine=machine, date='2025-07-02', daily_passages=3, created_by=user).save()
+        coverage = area.monthly_coverage.get(year=2025, month=7)
+        self.assertEqual((coverage.work_order_count, coverage.passage_sum), (1, 3))
+
+    def test_bulk_delete_refreshes_each_month_once_on_commit(self):
+        user = User.objects.create_user('operatore')
+        area = Area.objects.create(name='Area 1')
+        machine = CleaningMachine.objects.create(name='Spazzatrice 1')
+        with self.captureOnCommitCallbacks(execute=True):
+            street = Street.objects.create(name='Via 1', area=area)
+            for month, day in ((6, 1), (6, 2), (7, 1), (7, 2), (7, 3)):
+                WorkOrder.objects.create(
+                    street=street, cleaning_machine=machine, date=date(2025, month, day), daily_passages=1, created_by=user,
+                )
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            WorkOrder.objects.filter(date__day__lte=2).delete()
+        refreshes = [callback for callback in callbacks if callback is not caching.bump_data_version]
+        self.assertEqual(len(refreshes), 1)
+        refreshes[0]()
+
+        self.assertFalse(area.monthly_coverage.filter(year=2025, month=6).exists())
+        self.assertEqual(area.monthly_coverage.get(year=2025, month=7).work_order_count, 1)
+
+
+    def test_rebuild_command_invalidates_cached_views(self):
+        version = caching.data_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_coverage', stdout=StringIO())
+        self.assertNotEqual(caching.data_version(), version)
+
+
+def workbook(sheets):
+    """Cartella Excel in memoria da {nome foglio: righe}"""
+    book = openpyxl.Workbook()
+    book.remove(book.active)
+    for name, rows in sheets.items():
+        sheet = book.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+    data = BytesIO()
+    book.save(data)
+    data.seek(0)
+    return data
+
+
+class DailyImportDiffTests(TestCase):
+    """Un foglio della giornaliera sostituisce gli ordini del suo mese per la sua macchina e basta"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('operatore')
+
+    def import_sheets(self, sheets):
+        """`sheets`: {(macchina, 'MESE ANNO'): {via: {giorno: passaggi}}}"""
+        rows = {}
+        for (machine, month), streets in sheets.items():
+            rows[f'{machine} {month}'] = [[month], [machine], [None, *range(1, 32)]] + [
+                [street, *(days.get(day) for day in range(1, 32))] for street, days in streets.items()
+            ]
+        result = run_daily_activities_import(workbook(rows), 'giornaliera.xlsx', self.user, NullProgress())
+        self.assertTrue(result['success'], result)
+        return result
+
+    def work_orders(self):
+        return set(WorkOrder.objects.values_list(
+            'cleaning_machine__name', 'street__name', 'date', 'daily_passages',
+        ))
+
+    def test_reupload_deletes_only_missing_rows_of_same_machine_and_month(self):
+        self.import_sheets({
+            ('Spazzatrice 1', 'LUGLIO 2025'): {'Via 1': {1: 1, 2: 1}, 'Via 2': {1: 2}},
+            ('Spazzatrice 1', 'GIUGNO 2025'): {'Via 1': {1: 1}},
+            ('Spazzatrice 2', 'LUGLIO 2025'): {'Via 1': {1: 1}},
+        })
+
+        result = self.import_sheets({('Spazzatrice 1', 'LUGLIO 2025'): {'Via 1': {1: 3}}})
+
+        self.assertEqual(result['diff'], {'inserted': 0, 'updated': 1, 'deleted': 2, 'unchanged': 0})
+        self.assertEqual(self.work_orders(), {
+            ('Spazzatrice 1', 'Via 1', date(2025, 7, 1), 3),
+            ('Spazzatrice 1', 'Via 1', date(2025, 6, 1), 1),
+            ('Spazzatrice 2', 'Via 1', date(2025, 7, 1), 1),
+        })
+
+
+@override_settings(IMPORT_PARSE_WORKERS=1)
+class AreaDefinitionsImportDiffTests(TestCase):
+    """Un foglio di definitions.xlsx sostituisce le operazioni del suo mese per la sua area"""
+
+    operation = 'Spazzamento meccanizzato (2/SETTIMANA)'
+
+    def setUp(self):
+        self.user = User.objects.create_user('operatore')
+
+    def import_sheets(self, month, sheets):
+        """`sheets`: {area: {via: [giorni]}} per il mese ('GIUGNO' o 'LUGLIO') del 2025"""
+        rows = {'QUADRO GENERALE': [['riepilogo']]}
+        for area, streets in sheets.items():
+            rows[area] = [[None, 2025, month], ['-'], ['-'], ['-'], ['-'], [None, self.operation], ['VIE']] + [
+                [street, *days] for street, days in streets.items()
+            ]
+        result = run_area_definitions_import(workbook(rows), 'definitions.xlsx', self.user, NullProgress())
+        self.assertTrue(result['success'], result)
+        return result
+
+    def operations(self, **filters):
+        return set(StreetCleaningOperation.objects.filter(**filters).values_list(
+            'street__area__name', 'street__name', 'month', 'day_of_month', 'date',
+        ))
+
+    def test_reupload_deletes_only_missing_operations_of_same_area_and_month(self):
+        self.import_sheets('GIUGNO', {'Zona 1': {'Via 1': [2, 31]}})
+        self.import_sheets('LUGLIO', {'Zona 1': {'Via 1': [3, 10], 'Via 2': [5]}, 'Zona 2': {'Via 3': [4]}})
+
+        result = self.import_sheets('LUGLIO', {'Zona 1': {'Via 1': [3]}})
+
+        self.assertEqual(result['diff'], {'inserted': 0, 'deleted': 2, 'unchanged': 1})
+        self.assertEqual(self.operations(month=7), {
+            ('Zona 1', 'Via 1', 7, 3, date(2025, 7, 3)),
+            ('Zona 2', 'Via 3', 7, 4, date(2025, 7, 4)),
+        })
+        # Altri mesi invariati, compreso il 31 giugno che non ha una data
+        self.assertEqual(self.operations(month=6), {
+            ('Zona 1', 'Via 1', 6, 2, date(2025, 6, 2)),
+            ('Zona 1', 'Via 1', 6, 31, None),
+        })
+
+    def test_reupload_keeps_undated_operation_still_in_file(self):
+        self.import_sheets('GIUGNO', {'Zona 1': {'Via 1': [2, 31]}})
+
+        result = self.import_sheets('GIUGNO', {'Zona 1': {'Via 1': [31]}})
+
+        self.assertEqual(result['diff'], {'inserted': 0, 'deleted': 1, 'unchanged': 1})
+        self.assertEqual(self.operations(), {('Zona 1', 'Via 1', 6, 31, None)})
+
+    def test_reupload_replaces_generated_schedule_of_same_month_only(self):
+        self.import_sheets('LUGLIO', {'Zona 1': {'Via 1': [3]}})
+        generate_schedule(2025, 7)
+        inserted = generate_schedule(2025, 8)
+        generated_august = self.operations(month=8)
+        self.assertTrue(generated_august)
+        self.assertEqual(inserted, len(generated_august))
+        self.assertEqual(generate_schedule(2025, 8), 0)
+        self.assertGreater(len(self.operations(month=7)), 1)
+
+        # Il file è la programmazione completa del mese: le operazioni generate per
+        # luglio che non contiene vengono eliminate, quelle di agosto restano
+        self.import_sheets('LUGLIO', {'Zona 1': {'Via 1': [3]}})
+
+        self.assertEqual(self.operations(month=7), {('Zona 1', 'Via 1', 7, 3, date(2025, 7, 3))})
+        self.assertEqual(self.operations(month=8), generated_august)
+
+
+class StaleImportJobTests(TestCase):
+    """Job rimasti in attesa o in corso dopo un riavvio del processo"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('operatore')
+
+    def job(self, status, age, started=None):
+        """Job creato `age` fa; se in corso, avviato `started` fa (di default alla creazione)"""
+        with NamedTemporaryFile(delete=False, suffix='.xlsx') as upload:
+            pass
+        self.addCleanup(lambda: os.path.exists(upload.name) and os.remove(upload.name))
+        job = ImportJob.objects.create(kind='areas', file_name='aree.xlsx', file_path=upload.name, status=status, created_by=self.user)
+        now = timezone.now()
+        ImportJob.objects.filter(id=job.id).update(
+            created_at=now - age,
+            started_at=now - (started if started is not None else age) if status == 'running' else None,
+        )
+        return job
+
+    @override_settings(IMPORT_JOB_TIMEOUT=3600)
+    def test_stale_jobs_are_marked_failed(self):
+        stale = [self.job('pending', timedelta(hours=2)), self.job('running', timedelta(hours=2))]
+        # In coda a lungo ma avviato da poco
+        recent = self.job('running', timedelta(hours=2), started=timedelta(minutes=5))
+
+        self.assertEqual(recover_stale_jobs(), 2)
+
+        for job in stale:
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'failed')
+            self.assertIsNotNone(job.finished_at)
+        # Il file di un job in corso resta al worker, quello di un job in attesa no
+        self.assertFalse(os.path.exists(stale[0].file_path))
+        self.assertTrue(os.path.exists(stale[1].file_path))
+        recent.refresh_from_db()
+        self.assertEqual(recent.status, 'running')
+        self.assertTrue(os.path.exists(recent.file_path))
+
+        # Un job recuperato prima di essere avviato non viene più eseguito
+        run_job(stale[0].id)
+        stale[0].refresh_from_db()
+        self.assertEqual(stale[0].status, 'failed')
+
+    @override_settings(IMPORT_WORKERS=0, IMPORT_JOB_TIMEOUT=3600)
+    def test_worker_finishing_after_recovery_does_not_overwrite_failure(self):
+        job = self.job('pending', timedelta(0))
+        during_run = {}
+
+        def runner(*args, **kwargs):
+            # Il job viene recuperato mentre il worker lo sta ancora eseguendo
+            ImportJob.objects.filter(id=job.id).update(
+                created_at=timezone.now() - timedelta(hours=2), started_at=timezone.now() - timedelta(hours=2),
+            )
+            during_run['recovered'] = recover_stale_jobs()
+            during_run['file_exists'] = os.path.exists(job.file_path)
+            return {'success': True}
+
+        with patch.dict(RUNNERS, {'areas': runner}), self.assertLogs('main.jobs', 'WARNING'):
+            run_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(during_run, {'recovered': 1, 'file_exists': True})
+        self.assertEqual(job.status, 'failed')
+        self.assertFalse(os.path.exists(job.file_path))
+
+    @override_settings(DATABASE_REPLICA='sqlite', IMPORT_JOB_TIMEOUT=3600)
+    def test_abandoned_job_does_not_keep_session_on_primary(self):
+        job = self.job('running', timedelta(hours=2))
+        request = RequestFactory().get('/')
+        request.session = {STICKY_JOBS_SESSION_KEY: [job.id]}
+        self.assertFalse(is_sticky(request))
+
+
+@override_settings(DATABASE_REPLICA=None)
+class PageValidatorTests(TestCase):
+    def test_deleting_work_orders_changes_etag(self):
+        user = User.objects.create_user('operatore')
+        self.client.force_login(user)
+        area = Area.objects.create(name='Area 1')
+        street = Street.objects.create(name='Via 1', area=area)
+        machine = CleaningMachine.objects.create(name='Spazzatrice 1')
+        for day in (1, 2):
+            WorkOrder.objects.create(
+                street=street, cleaning_machine=machine, date=date(2025, 7, day), daily_passages=1, created_by=user,
+            )
+        url = reverse('area_view', args=[area.id])
+        params = {'start': '2025-07-01', 'end': '2025-07-31'}
+
+        response = self.client.get(url, params)
+        self.assertNotIn('Last-Modified', response)
+        # Una sola query per l'ETag (più sessione e utente), anche quando la risposta è 304
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(url, params, headers={'If-None-Match': response['ETag']}).status_code, 304)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, params, headers={'If-None-Match': etag}).status_code, 304)
+
+        # Un'importazione differenziale elimina righe senza cambiare l'ultimo updated_at
+        WorkOrder.objects.filter(date=date(2025, 7, 1)).delete()
+        self.assertEqual(self.client.get(url, params, headers={'If-None-Match': etag}).status_code, 200)
+
+
+class ComplianceCompareTests(SimpleTestCase):
+    """Esiti di `compare` su una strada in un mese di 31 giorni"""
+
+    def days(self, *days):
+        matrix = np.zeros((1, 31), dtype=bool)
+        matrix[0, [day - 1 for day in days]] = True
+        return matrix
+
+    def outcomes(self, planned, actual, late_days=2):
+        outcomes, unplanned = compare(
+            {operation_type_id: self.days(*days) for operation_type_id, days in planned.items()},
+            self.days(*actual), late_days,
+        )
+        counts = {
+            operation_type_id: {name: int(matrix.sum()) for name, matrix in matrices.items() if name != 'planned'}
+            for operation_type_id, matrices in outcomes.items()
+        }
+        return counts, np.flatnonzero(unplanned[0]).tolist()
+
+    def test_passage_on_planned_day_is_on_time(self):
+        self.assertEqual(self.outcomes({1: [5]}, [5]), ({1: {'on_time': 1, 'late': 0, 'missed': 0}}, []))
+
+    def test_passage_within_late_days_is_late(self):
+        self.assertEqual(self.outcomes({1: [5]}, [7]), ({1: {'on_time': 0, 'late': 1, 'missed': 0}}, []))
+
+    def test_passage_after_late_days_is_missed_and_unplanned(self):
+        self.assertEqual(self.outcomes({1: [5]}, [8]), ({1: {'on_time': 0, 'late': 0, 'missed': 1}}, [7]))
+
+    def test_passage_without_planned_operations_is_unplanned(self):
+        self.assertEqual(self.outcomes({}, [3, 4]), ({}, [2, 3]))
+
+    def test_recovery_does_not_wrap_around_month_end(self):
+        self.assertEqual(self.outcomes({1: [30, 31]}, [1, 31]), ({1: {'on_time': 1, 'late': 0, 'missed': 1}}, [0]))
+
+    def test_one_passage_recovers_only_the_earliest_miss(self):
+        self.assertEqual(self.outcomes({1: [5, 6]}, [7]), ({1: {'on_time': 0, 'late': 1, 'missed': 1}}, []))
+        outcomes, _ = compare({1: self.days(5, 6)}, self.days(7), 2)
+        self.assertEqual(np.flatnonzero(outcomes[1]['late'][0]).tolist(), [4])
+
+    def test_one_passage_recovers_only_one_operation_type(self):
+        self.assertEqual(
+            self.outcomes({1: [5], 2: [5]}, [6]),
+            ({1: {'on_time': 0, 'late': 1, 'missed': 0}, 2: {'on_time': 0, 'late': 0, 'missed': 1}}, []),
+        )
@@ -6,9 +6,15 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('compliance/', views.compliance, name='compliance'),
+    path('utilization/', views.utilization, name='utilization'),
+    path('utilization/data/', views.utilization_data, name='utilization_data'),
+    path('area/<int:area_id>/work-orders/', views.area_work_orders, name='area_work_orders'),
     path('area/<int:area_id>/', views.area_view, name='area_view'),
     path('area/<int:area_id>/<str:view_type>/', views.area_view, name='area_view'),
     path('import/streets/', views.import_streets, name='import_streets'),
     path('import/areas/', views.import_areas, name='import_areas'),
     path('import/daily-activities/', views.import_daily_activities, name='import_daily_activities'),
+    path('import/area-definitions/', views.import_area_definitions, name='import_area_definitions'),
+    path('import/jobs/<int:job_id>/', views.import_job_status, name='import_job_status'),
 ]
\ No newline at end of file
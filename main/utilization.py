@@ -0,0 +1,116 @@
+"""Utilizzo delle macchine spazzatrici rispetto al piano passaggi (PassagePlan).
+
+Per ogni mese del periodo una query raggruppata somma `WorkOrder.daily_passages` per
+macchina e giorno, mentre il piano dell'intero periodo si legge con una ricerca per
+intervallo sulla data indicizzata; piano ed eseguito vengono disposti in matrici dense
+macchine × giorni e confrontati. Per un anno le colonne sono i mesi (somme delle
+colonne giornaliere). Non vengono mai letti i singoli ordini di lavoro; per i mesi
+archiviati la stessa query si ripete su ArchivedWorkOrder.
+"""
+from calendar import monthrange
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Sum
+
+from .caching import cached_view_data
+from .archive import work_order_sources
+from .models import CleaningMachine, PassagePlan
+
+
+def _required(first, last, machine_index):
+    """Passaggi richiesti come matrice macchine × giorni da `first` a `last` (una ricerca per intervallo di date)"""
+    required = np.zeros((len(machine_index), (last - first).days + 1), dtype=np.int64)
+    for machine_id, plan_date, passages in PassagePlan.objects.filter(
+        date__range=(first, last),
+    ).values_list('cleaning_machine_id', 'date', 'required_passages'):
+        required[machine_index[machine_id], (plan_date - first).days] = passages
+    return required
+
+
+def _actual(year, month, machine_index):
+    """Passaggi eseguiti come matrice macchine × giorni del mese"""
+    days = monthrange(year, month)[1]
+    actual = np.zeros((len(machine_index), days), dtype=np.int64)
+    for work_orders in work_order_sources(date(year, month, 1), date(year, month, days)):
+        for machine_id, work_date, passages in (
+            work_orders
+            .values_list('cleaning_machine_id', 'date')
+            .annotate(passages=Sum('daily_passages'))
+            .order_by()
+        ):
+            actual[machine_index[machine_id], work_date.day - 1] += passages
+    return actual
+
+
+def classify(actual, required, tolerance):
+    """Stato di ogni cella: 'under', 'ok', 'over', 'unplanned' (eseguito senza piano) o '' (nulla)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(required > 0, actual / required, np.nan)
+    status = np.full(actual.shape, '', dtype=object)
+    status[ratio < 1 - tolerance] = 'under'
+    status[(ratio >= 1 - tolerance) & (ratio <= 1 + tolerance)] = 'ok'
+    status[ratio > 1 + tolerance] = 'over'
+    status[(required == 0) & (actual > 0)] = 'unplanned'
+    return ratio, status
+
+
+def build_utilization(year, month=None, tolerance=None):
+    """Utilizzo per macchina del mese indicato (colonne per giorno) o dell'anno (colonne per mese).
+
+    Restituisce {'columns', 'machines': [{'machine_id', 'machine', 'actual', 'required',
+    'ratio', 'status', 'total_actual', 'total_required'}], 'totals'} con liste parallele
+    alle colonne.
+    """
+    if tolerance is None:
+        tolerance = settings.UTILIZATION_TOLERANCE
+    machines = list(CleaningMachine.objects.order_by('name').values_list('id', 'name'))
+    machine_index = {machine_id: i for i, (machine_id, _) in enumerate(machines)}
+
+    if month:
+        actual = _actual(year, month, machine_index)
+        required = _required(date(year, month, 1), date(year, month, actual.shape[1]), machine_index)
+        columns = [date(year, month, day).isoformat() for day in range(1, actual.shape[1] + 1)]
+    else:
+        actual = np.stack([_actual(year, m, machine_index).sum(axis=1) for m in range(1, 13)], axis=1)
+        # Piano dell'anno con una sola ricerca, sommato per mese a partire dal primo giorno di ognuno
+        month_starts = [(date(year, m, 1) - date(year, 1, 1)).days for m in range(1, 13)]
+        required = np.add.reduceat(_required(date(year, 1, 1), date(year, 12, 31), machine_index), month_starts, axis=1)
+        columns = [f'{year}-{m:02d}' for m in range(1, 13)]
+
+    ratio, status = classify(actual, required, tolerance)
+    rows = []
+    for i, (machine_id, name) in enumerate(machines):
+        rows.append({
+            'machine_id': machine_id,
+            'machine': name,
+            'actual': actual[i].tolist(),
+            'required': required[i].tolist(),
+            'ratio': [None if np.isnan(value) else round(float(value), 3) for value in ratio[i]],
+            'status': status[i].tolist(),
+            'total_actual': int(actual[i].sum()),
+            'total_required': int(required[i].sum()),
+        })
+    total_actual, total_required = int(actual.sum()), int(required.sum())
+    return {
+        'year': year,
+        'month': month,
+        'tolerance': tolerance,
+        'columns': columns,
+        'machines': rows,
+        'totals': {
+            'actual': total_actual,
+            'required': total_required,
+            'ratio': round(total_actual / total_required, 3) if total_required else None,
+        },
+    }
+
+
+def machine_utilization(year, month=None):
+    """`build_utilization` in cache finché non cambiano i dati"""
+    return cached_view_data(
+        'utilization',
+        {'year': year, 'month': month, 'tolerance': settings.UTILIZATION_TOLERANCE},
+        lambda: build_utilization(year, month),
+    )
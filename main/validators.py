@@ -0,0 +1,36 @@
+"""Validatori HTTP (ETag) per le pagine di consultazione.
+
+L'ETag viene calcolato dalla versione dei dati della cache (`main.caching`, incrementata
+da importazioni, segnali e archiviazione) e da una query aggregata sugli ordini di lavoro
+mostrati dalla pagina (ultimo `updated_at` e numero di righe), che copre le modifiche
+senza segnali: se il browser o il proxy hanno già la versione corrente ricevono un 304
+senza che la vista esegua le query complete né il rendering del template. Non viene inviato Last-Modified: la data più recente delle righe non cambia
+quando delle righe vengono eliminate (es. importazione differenziale), quindi un client
+che invia solo If-Modified-Since riceverebbe un 304 con dati non aggiornati.
+"""
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.views.decorators.http import condition
+
+from .caching import data_version
+
+
+def page_validators(request, name, params, probes):
+    """Restituisce l'ETag della pagina `name`.
+
+    `probes` è una lista di (queryset, campo data) che delimitano i dati mostrati.
+    L'ETag comprende anche utente e cookie CSRF, perché la pagina li contiene.
+    """
+    parts = [name, *(f'{key}={params[key]}' for key in sorted(params)), str(data_version())]
+    parts += [str(request.user.pk), request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')]
+    for queryset, field in probes:
+        probe = queryset.order_by().aggregate(last=Max(field), count=Count('pk'))
+        parts.append(f"{probe['count']}@{probe['last'].isoformat() if probe['last'] else ''}")
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def conditional_page(validators):
+    """Come `condition`, con l'ETag calcolato da `validators(request, *args, **kwargs)`"""
+    return condition(etag_func=validators)
@@ -0,0 +1,41 @@
+"""Lettura delle cartelle Excel caricate: il file viene aperto una sola volta per tutti i fogli."""
+import pandas as pd
+
+
+class Workbook:
+    """Cartella Excel aperta una volta sola.
+
+    I fogli vengono letti al primo accesso (`sheet`) oppure tutti insieme (`sheets`)
+    e restano in memoria, così ogni foglio viene analizzato al massimo una volta.
+    """
+
+    def __init__(self, source, header=None):
+        self._excel = pd.ExcelFile(source)
+        self._header = header
+        self._frames = {}
+        self.sheet_names = self._excel.sheet_names
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def sheet(self, name):
+        """Restituisce il DataFrame del foglio `name` (nome o indice)"""
+        if isinstance(name, int):
+            name = self.sheet_names[name]
+        if name not in self._frames:
+            self._frames[name] = self._excel.parse(name, header=self._header)
+        return self._frames[name]
+
+    def sheets(self, names=None):
+        """Restituisce {nome foglio: DataFrame} leggendo in un'unica passata i fogli non ancora letti"""
+        names = list(self.sheet_names if names is None else names)
+        missing = [name for name in names if name not in self._frames]
+        if missing:
+            self._frames.update(self._excel.parse(missing, header=self._header))
+        return {name: self._frames[name] for name in names}
+
+    def close(self):
+        self._excel.close()